@@ -0,0 +1,78 @@
+"""Per-cycle cost of the DataFrame candle path vs the array-backed `Candles` path
+
+Usage: python benchmarks/bench_candles.py [symbols] [candles]
+"""
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candles import Candles, last_value
+from config import Config
+from strategy import TradingStrategy
+
+
+def make_responses(symbols: int, candles: int):
+    """Synthetic ccxt-style OHLCV responses (list of lists per symbol)"""
+    rng = np.random.default_rng(7)
+    start = 1_700_000_000_000
+    responses = []
+    for _ in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, candles)))
+        rows = [[start + i * 300_000, c, c * 1.001, c * 0.999, c, float(rng.integers(1, 10_000))]
+                for i, c in enumerate(close.tolist())]
+        responses.append(rows)
+    return responses
+
+
+def dataframe_cycle(strategy, responses):
+    for ohlcv in responses:
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        strategy.get_signal(df)
+        last_value(df['volume'])
+
+
+def candles_cycle(strategy, responses):
+    for ohlcv in responses:
+        data = Candles.from_ohlcv(ohlcv)
+        strategy.get_signal(data)
+        last_value(data['volume'])
+
+
+def measure(name, cycle, strategy, responses, rounds=5):
+    cycle(strategy, responses)  # warm up
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        cycle(strategy, responses)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    cycle(strategy, responses)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<10} best {min(timings) * 1000:8.2f} ms/cycle   peak alloc {peak / 1024:8.1f} KiB")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    candles = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    logging.disable(logging.INFO)
+
+    strategy = TradingStrategy(Config.SMA_PERIOD, Config.EMA_PERIOD)
+    responses = make_responses(symbols, candles)
+    print(f"{symbols} symbols x {candles} candles per cycle")
+    measure('dataframe', dataframe_cycle, strategy, responses)
+    measure('candles', candles_cycle, strategy, responses)
+
+
+if __name__ == '__main__':
+    main()
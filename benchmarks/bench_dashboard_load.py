@@ -0,0 +1,184 @@
+"""Trading-loop cycle times with and without dashboard load, in single- and split-process mode
+
+Each mode runs the unchanged trading loop against the simulator in a fresh process
+and times the work of every cycle (from the candle-close wake-up to the next wait).
+Dashboard load is --clients threads requesting the dashboard page back to back: in
+single mode they hit the Flask app inside the trading process, in split mode they
+run in a web process (at WEB_NICE priority, as main.py starts it) and read the state
+the engine publishes to shared memory.
+
+Usage: python benchmarks/bench_dashboard_load.py [--symbols 20] [--days 7] [--clients 4]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils import timeframe_to_seconds
+
+TIMEFRAME = '5m'
+
+
+def configure(shm_name: str, port: int, authkey: str):
+    Config.STATE_SHM_NAME = shm_name
+    Config.ENGINE_RPC_PORT = port
+    Config.ENGINE_RPC_AUTHKEY = authkey
+
+
+def time_cycles(cycles: list):
+    """Record the wall time the loop spends between returning from one candle wait and entering the next"""
+    from scheduler import CandleScheduler
+    wait_for_close = CandleScheduler.wait_for_close
+    woke = [None]
+
+    def timed(self, timeframe):
+        if woke[0] is not None:
+            cycles.append(time.perf_counter() - woke[0])
+        result = wait_for_close(self, timeframe)
+        woke[0] = time.perf_counter()
+        return result
+
+    CandleScheduler.wait_for_close = timed
+
+
+def start_load(clients: int, stop: threading.Event, counter: list):
+    from server import app
+
+    def client():
+        http = app.test_client()
+        while not stop.is_set():
+            http.get('/')
+            counter[0] += 1
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_engine(mode: str, clients: int, symbols: int, days: float, settings: tuple, ready, go, results):
+    """One trading process: the simulated loop, plus in-process load (single) or a state publisher (split)"""
+    from functools import partial
+    logging.basicConfig(level=logging.CRITICAL)
+    configure(*settings)
+    import server
+    from bot_control import bot_controller
+    from engine import EngineControl, TradingEngine
+    from simulator import (MatchingEngine, SimClock, SimulatedExchange, SimulatedNotifier,
+                           synthetic_candles)
+    from trading_bot import run_trading_bot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.JOURNAL_PATH = os.path.join(tmp, 'journal.bin')
+        Config.TIMEFRAME = TIMEFRAME
+        count = int(days * 86400 / timeframe_to_seconds(TIMEFRAME)) + 101
+        candles = synthetic_candles(symbols, count, TIMEFRAME)
+        matching = MatchingEngine(candles, TIMEFRAME)
+        first = min(int(data['timestamp'][0]) for data in candles.values())
+        clock = SimClock(matching, first + 101 * matching.tf_ms + 2000)
+        exchange = SimulatedExchange(matching)
+        bot = partial(run_trading_bot, exchange=exchange, notifier=SimulatedNotifier(), clock=clock)
+        control = EngineControl(exchange=exchange, bot_function=bot)
+
+        cycles, counter, stop = [], [0], threading.Event()
+        time_cycles(cycles)
+        engine = None
+        if mode == 'split':
+            engine = TradingEngine(control)
+            engine.start()
+
+            def publish():
+                while not stop.wait(Config.STATE_PUBLISH_INTERVAL):
+                    engine.publish()
+
+            threading.Thread(target=publish, daemon=True).start()
+        elif clients:
+            server.backend = control
+            start_load(clients, stop, counter)
+
+        ready.set()
+        go.wait()
+        started = time.perf_counter()
+        control.start_bot()
+        clock.finished.wait()
+        bot_controller.stop_bot()
+        bot_controller.bot_thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        if engine is not None:
+            engine.close()
+        results.put({'cycles': cycles, 'wall': elapsed, 'requests': counter[0]})
+
+
+def run_web(clients: int, settings: tuple, started, stop, results):
+    """The split-mode web process, at the priority main.py gives it, serving dashboard load"""
+    logging.basicConfig(level=logging.CRITICAL)
+    configure(*settings)
+    if Config.WEB_NICE:
+        os.nice(Config.WEB_NICE)
+    import server
+    from engine import RemoteEngine
+    server.backend = RemoteEngine()
+    counter = [0]
+    start_load(clients, threading.Event(), counter)
+    started.set()
+    stop.wait()
+    results.put(counter[0])
+
+
+def run_mode(mode: str, clients: int, args) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    settings = (f"bench_state_{os.getpid()}_{mode}_{clients}", 18765 + clients + (100 if mode == 'split' else 0),
+                secrets.token_hex(16))
+    ready, go, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    process = ctx.Process(target=run_engine, args=(mode, clients, args.symbols, args.days, settings, ready, go, results))
+    process.start()
+    ready.wait()
+
+    web = None
+    if mode == 'split' and clients:
+        web_started, web_stop, web_results = ctx.Event(), ctx.Event(), ctx.Queue()
+        web = ctx.Process(target=run_web, args=(clients, settings, web_started, web_stop, web_results))
+        web.start()
+        web_started.wait()
+    go.set()
+    result = results.get()
+    process.join()
+    if web is not None:
+        web_stop.set()
+        result['requests'] += web_results.get()
+        web.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--clients', type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{args.symbols} symbols, {args.days:g} days of {TIMEFRAME} candles, {args.clients} dashboard clients")
+    print(f"{'mode':<22}{'cycles':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'page/s':>9}")
+    for mode, clients in (('single', 0), ('single', args.clients), ('split', 0), ('split', args.clients)):
+        result = run_mode(mode, clients, args)
+        cycles = np.array(result['cycles']) * 1000
+        p50, p95, p99 = np.percentile(cycles, [50, 95, 99])
+        label = f"{mode} {'+ load' if clients else 'idle'}"
+        print(f"{label:<22}{len(cycles):>8}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}{cycles.max():>9.1f}"
+              f"{result['requests'] / result['wall']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
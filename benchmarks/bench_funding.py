@@ -0,0 +1,70 @@
+"""Funding filter cost per scan and exchange requests saved by the bulk cache
+
+Usage: python benchmarks/bench_funding.py [instruments]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from funding import FundingCache
+
+SCANS_PER_DAY = 288  # one scan per 5m candle
+
+
+class BulkExchange:
+    """Counts bulk snapshot requests (funding rate + mark price) for a synthetic market"""
+
+    def __init__(self, count: int):
+        rng = np.random.default_rng(3)
+        self.rows = {f"COIN{i}/USDT:USDT": {'funding_rate': float(rate), 'funding_time': 0, 'mark_price': 100.0}
+                     for i, rate in enumerate(rng.normal(0.0001, 0.0004, count))}
+        self.requests = 0
+
+    def fetch_funding_snapshot(self):
+        self.requests += 2
+        return self.rows
+
+
+class DayClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    exchange = BulkExchange(count)
+    clock = DayClock()
+    cache = FundingCache(exchange, clock)
+    symbols = list(exchange.rows)
+    period = 8 * 3600
+
+    for candidates in (10, count):
+        batch = [{'symbol': symbol, 'signal': {'action': 'long' if i % 2 else 'short'}}
+                 for i, symbol in enumerate(symbols[:candidates])]
+        timings = np.empty(1000)
+        for n in range(len(timings)):
+            # Settlements every 8h; the cache is asked once per 5m scan
+            clock.now += 86400 / SCANS_PER_DAY
+            for row in exchange.rows.values():
+                row['funding_time'] = int((clock.now // period + 1) * period * 1000)
+            fresh = [dict(c) for c in batch]
+            started = time.perf_counter()
+            kept = cache.filter_adverse(fresh)
+            timings[n] = time.perf_counter() - started
+        print(f"{candidates:>4} candidates: p50 {np.percentile(timings, 50) * 1e6:.0f} us, "
+              f"p99 {np.percentile(timings, 99) * 1e6:.0f} us (includes refreshes), kept {len(kept)}")
+
+    days = len(timings) * 2 / SCANS_PER_DAY
+    print(f"bulk cache: {exchange.requests / days:.0f} requests/day; "
+          f"per-symbol calls for 10 candidates: {2 * 10 * SCANS_PER_DAY} requests/day")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Trade journal write latency and query times
+
+Usage: python benchmarks/bench_journal.py [records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import TradeJournal, SIGNAL, ORDER, EXIT_TP, EXIT_SL
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(3)
+    symbols = [f"COIN{i}/USDT:USDT" for i in range(200)]
+    events = [SIGNAL, ORDER, EXIT_TP, EXIT_SL]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = TradeJournal(os.path.join(tmp, 'journal.bin'), flush_interval=0.2)
+        start_ts = 1_700_000_000_000
+        timings = np.empty(count)
+        for i in range(count):
+            event = events[i % 4]
+            began = time.perf_counter()
+            journal.record(event, symbols[i % 200], start_ts + i * 1000, side=1, price=100.0,
+                           quantity=1.0, pnl=float(rng.normal()) if event >= EXIT_TP else 0.0,
+                           latency=float(rng.uniform(50, 900)))
+            timings[i] = time.perf_counter() - began
+        journal.close()
+
+        p50, p99, worst = np.percentile(timings, [50, 99, 100]) * 1e6
+        size = os.path.getsize(journal.path)
+        print(f"{count:,} records, {size / count:.0f} bytes/record on disk")
+        print(f"record()   p50 {p50:6.2f} us   p99 {p99:6.2f} us   max {worst:8.2f} us")
+
+        began = time.perf_counter()
+        reopened = TradeJournal(journal.path)
+        print(f"reload     {(time.perf_counter() - began) * 1000:8.2f} ms")
+
+        week_ago = start_ts + (count - 7 * 86400 // 1) * 1000
+        for name, query in [
+            ('summary(week)', lambda: reopened.summary(since=week_ago)),
+            ('pnl_by_symbol(all)', lambda: reopened.pnl_by_symbol()),
+            ('latency_percentiles', lambda: reopened.latency_percentiles(ORDER)),
+            ('recent(50, symbol)', lambda: reopened.recent(50, symbols[7])),
+        ]:
+            began = time.perf_counter()
+            for _ in range(10):
+                query()
+            print(f"{name:<20} {(time.perf_counter() - began) * 100:8.2f} ms")
+        reopened.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Circuit breaker regression check: a failed half-open trial must reopen the breaker, never wedge it
+
+The breaker is tripped with network errors, then the half-open trial raises a
+non-ccxt exception (as a ccxt parser bug or our own code would). The breaker has
+to be open again, and after the reset timeout a successful trial has to close it.
+
+Usage: python benchmarks/check_breaker.py
+"""
+import logging
+import os
+import sys
+import time
+
+import ccxt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from resilience import CircuitOpenError, ResilienceManager
+
+
+def fail(error: Exception):
+    def operation():
+        raise error
+    return operation
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    Config.BREAKER_FAILURE_THRESHOLD = 2
+    Config.BREAKER_RESET_TIMEOUT = 0.2
+    Config.RETRY_MAX_ATTEMPTS = 1
+    manager = ResilienceManager()
+    name = 'check_endpoint'
+
+    for _ in range(Config.BREAKER_FAILURE_THRESHOLD):
+        try:
+            manager.call(name, fail(ccxt.NetworkError('down')), idempotent=False)
+        except ccxt.NetworkError:
+            pass
+    time.sleep(Config.BREAKER_RESET_TIMEOUT)
+    try:
+        manager.call(name, fail(KeyError('data')), idempotent=False)
+    except KeyError:
+        pass
+
+    state = manager.breakers[name].status()
+    print(f"after failed trial: {state}")
+    if state['state'] != 'open':
+        print(f"FAIL: breaker left {state['state']} after a non-ccxt error in the half-open trial")
+        sys.exit(1)
+
+    time.sleep(Config.BREAKER_RESET_TIMEOUT)
+    try:
+        manager.call(name, lambda: 'ok', idempotent=False)
+    except CircuitOpenError as e:
+        print(f"FAIL: breaker did not let a trial through after the reset timeout: {str(e)}")
+        sys.exit(1)
+    state = manager.breakers[name].status()
+    print(f"after successful trial: {state}")
+    if state['state'] != 'closed':
+        print("FAIL: successful trial did not close the breaker")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Memory soak: run many simulated trading cycles and check that memory stays flat
+
+Traced Python memory is sampled in the background while the unchanged trading
+loop runs against the simulator. Tracing starts after the synthetic candles are
+generated, so everything allocated during the run counts, including the
+simulator's own bookkeeping. The first quarter of the run is treated as
+warm-up, and the run fails if the last quarter holds more than --tolerance-mb
+above the second quarter.
+
+Usage: python benchmarks/soak_memory.py [--symbols 20] [--days 14] [--tolerance-mb 0.5]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from indicators import indicator_graph
+from memory import rss_bytes
+from utils import timeframe_to_seconds
+
+EXCLUDE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--days', type=float, default=14)
+    parser.add_argument('--timeframe', default='5m')
+    parser.add_argument('--tolerance-mb', type=float, default=0.5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.JOURNAL_PATH = os.path.join(tmp, 'journal.bin')
+        # Small caps so the bounded buffers fill during warm-up and any later growth is a leak
+        Config.JOURNAL_MAX_RECORDS = 2000
+        Config.SIM_MAX_MESSAGES = 100
+        Config.SIM_MAX_TRADES = 100
+        indicator_graph.max_entries = 64
+
+        from simulator import run_simulation, synthetic_candles
+        count = int(args.days * 86400 / timeframe_to_seconds(args.timeframe)) + 101
+        candles = synthetic_candles(args.symbols, count, args.timeframe)
+
+        tracemalloc.start()
+        samples = []
+        done = threading.Event()
+
+        def sampler():
+            while not done.wait(0.25):
+                traced = sum(stat.size for stat in tracemalloc.take_snapshot().filter_traces(EXCLUDE).statistics('filename'))
+                samples.append((traced, rss_bytes()))
+
+        thread = threading.Thread(target=sampler, daemon=True)
+        thread.start()
+        result = run_simulation(candles, args.timeframe)
+        done.set()
+        thread.join()
+        tracemalloc.stop()
+
+    if len(samples) < 8:
+        print(f"Only {len(samples)} samples, run longer (--days)")
+        sys.exit(2)
+    traced = np.array([s[0] for s in samples], dtype=float) / 2 ** 20
+    rss = np.array([s[1] for s in samples], dtype=float) / 2 ** 20
+    quarter = len(samples) // 4
+    growth = traced[-quarter:].mean() - traced[quarter:2 * quarter].mean()
+    rss_growth = rss[-quarter:].mean() - rss[quarter:2 * quarter].mean()
+
+    print(f"{result['candles']} cycles x {result['symbols']} symbols in {result['wall_seconds']:.1f}s, "
+          f"{result['orders']} orders, {result['closed_trades']} closed trades")
+    print(f"traced memory: start {traced[0]:.2f} MB, peak {traced.max():.2f} MB, end {traced[-1]:.2f} MB")
+    print(f"growth after warm-up: traced {growth:+.3f} MB, rss {rss_growth:+.2f} MB ({len(samples)} samples)")
+    if growth > args.tolerance_mb:
+        print(f"FAIL: traced memory grew {growth:.3f} MB > {args.tolerance_mb} MB")
+        sys.exit(1)
+    print("OK: memory flat")
+
+
+if __name__ == '__main__':
+    main()
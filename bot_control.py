@@ -1,18 +1,22 @@
 import logging
 import threading
-from typing import Optional
+from typing import Dict, Optional
+
+from kill_switch import flatten_all
 
 logger = logging.getLogger(__name__)
 
 class BotController:
     _instance = None
     _lock = threading.Lock()
+    _flatten_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(BotController, cls).__new__(cls)
             cls._instance.bot_thread: Optional[threading.Thread] = None
             cls._instance.bot_running: bool = False
+            cls._instance.stop_event = threading.Event()  # wakes sleeping loops on stop
         return cls._instance
 
     def start_bot(self, bot_function) -> bool:
@@ -24,6 +28,7 @@ class BotController:
 
             try:
                 self.bot_running = True
+                self.stop_event.clear()
                 self.bot_thread = threading.Thread(target=bot_function)
                 self.bot_thread.daemon = True
                 self.bot_thread.start()
@@ -43,6 +48,7 @@ class BotController:
 
             try:
                 self.bot_running = False
+                self.stop_event.set()
                 if self.bot_thread:
                     self.bot_thread.join(timeout=1.0)
                 logger.info("Trading bot stopped successfully")
@@ -51,6 +57,20 @@ class BotController:
                 logger.error(f"Failed to stop bot: {str(e)}")
                 return False
 
+    def emergency_flatten(self, exchange) -> Dict:
+        """Stop the bot, cancel all orders and close all positions; returns the flatten report"""
+        with self._flatten_lock:
+            logger.warning("Emergency flatten requested")
+            if self.is_running():
+                self.stop_bot()
+            report = flatten_all(exchange)
+            if report['flat']:
+                logger.warning(f"Account flat after {report['elapsed']:.2f}s "
+                               f"({len(report['positions'])} positions, {report['rounds']} rounds)")
+            else:
+                logger.error(f"Emergency flatten incomplete after {report['elapsed']:.2f}s")
+            return report
+
     def is_running(self) -> bool:
         """Check if the bot is currently running"""
         with self._lock:
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+CANDLE_DTYPE = np.dtype([(field, np.float64) for field in CANDLE_FIELDS])
+
+
+class Candles:
+    """Compact OHLCV container backed by a single NumPy structured array
+
+    Built straight from the ccxt list-of-lists response: the rows are converted
+    once into a contiguous float64 block which is then reinterpreted as a
+    structured array, so every column access is a view and no DataFrame or
+    datetime conversion is needed on the hot path. `symbol` and `timeframe` are
+    optional and let consumers share cached indicators for the same series.
+    """
+    __slots__ = ('data', 'symbol', 'timeframe')
+
+    def __init__(self, data: np.ndarray, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        self.data = data
+        self.symbol = symbol
+        self.timeframe = timeframe
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv: List[List[float]], symbol: Optional[str] = None,
+                   timeframe: Optional[str] = None) -> 'Candles':
+        """Build candles from a ccxt OHLCV response"""
+        if not ohlcv:
+            return cls(np.empty(0, dtype=CANDLE_DTYPE), symbol, timeframe)
+        block = np.asarray(ohlcv, dtype=np.float64)
+        if block.ndim != 2 or block.shape[1] != len(CANDLE_FIELDS):
+            raise ValueError(f"Unexpected OHLCV shape: {block.shape}")
+        return cls(np.ascontiguousarray(block).view(CANDLE_DTYPE).reshape(-1), symbol, timeframe)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.data[field]
+
+    @property
+    def empty(self) -> bool:
+        return len(self.data) == 0
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.data['close']
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.data['volume']
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Opt-in DataFrame view matching the legacy `fetch_ohlcv` layout"""
+        df = pd.DataFrame({field: self.data[field] for field in CANDLE_FIELDS})
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype(np.int64), unit='ms')
+        return df
+
+
+def last_value(column) -> float:
+    """Last element of a Series or ndarray column"""
+    return float(np.asarray(column)[-1])
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average; NaN until `period` values are available"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        sums = np.cumsum(values)
+        out[period - 1] = sums[period - 1]
+        out[period:] = sums[period:] - sums[:-period]
+        out[period - 1:] /= period
+    return out
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Recursive EMA matching pandas `ewm(span, adjust=False, min_periods=span)`"""
+    out = np.full(len(values), np.nan)
+    if len(values) == 0:
+        return out
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    current = float(values[0])
+    result = [current]
+    for value in values[1:].tolist():
+        current = decay * current + alpha * value
+        result.append(current)
+    out[:] = result
+    out[:span - 1] = np.nan
+    return out
@@ -0,0 +1,24 @@
+import threading
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """Wall clock used by the trading loop; the simulator swaps in a virtual one"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """Sleep up to seconds, returning early (True) if event gets set"""
+        return event.wait(seconds)
+
+
+# Global instance
+system_clock = SystemClock()
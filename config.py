@@ -28,6 +28,101 @@ class Config:
     SCALE_MULTIPLIER = 1.1
     SMA_PERIOD = 21
     EMA_PERIOD = 34
+    INDICATOR_CACHE_SIZE = 256  # (symbol, timeframe, candle) entries kept by the indicator graph; only the latest candles are reused
+
+    # Portfolio Selection
+    CORRELATION_THRESHOLD = float(os.getenv('CORRELATION_THRESHOLD', '0.7'))  # max direction-signed return correlation between bets
+    CORRELATION_WINDOW = 288  # candles of returns (one day of 5m candles)
+    CORRELATION_MIN_PERIODS = 30  # shared returns needed before a pair is trusted
+    CORRELATION_MAX_SYMBOLS = 256  # universe cap; least recently seen symbols are evicted
+
+    # Funding
+    FUNDING_MAX_COST = float(os.getenv('FUNDING_MAX_COST', '0.0005'))  # skip entries paying more than 0.05% per settlement
+    FUNDING_MAX_AGE = 3600  # seconds before predicted rates are refreshed between settlements
+    FUNDING_RETRY_DELAY = 60  # seconds before retrying a failed or not yet rolled-over refresh
+
+    # Execution Parameters
+    WS_PUBLIC_URL = os.getenv('BLOFIN_WS_PUBLIC_URL', 'wss://demo-trading-openapi.blofin.com/ws/public')
+    MAX_SLIPPAGE = float(os.getenv('MAX_SLIPPAGE', '0.002'))  # 0.2% expected VWAP vs last price
+    MIN_FILL_RATIO = float(os.getenv('MIN_FILL_RATIO', '0.5'))  # Skip trades resized below 50%
+    ORDER_BOOK_MAX_AGE = 5  # seconds a REST snapshot stays usable
+
+    # Exchange Resilience
+    RETRY_MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt with full jitter
+    RETRY_MAX_DELAY = 8
+    RETRY_BUDGET = 20  # max seconds a single call may spend retrying
+    RATE_LIMIT_BACKOFF = 10  # trading limit window is 30 requests / 10s
+    FIREWALL_BAN_SECONDS = 300  # 403 means a five-minute temporary ban
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_TIMEOUT = 30
+    HEDGE_MIN_DELAY = 0.5  # never hedge reads sooner than this
+    HEDGE_BUDGET = 0.05  # at most ~5% extra read requests
+    TRADE_RATE_LIMIT = 30  # trading requests allowed per window
+    TRADE_RATE_WINDOW = 10  # seconds
+
+    # Kill Switch
+    FLATTEN_WORKERS = 8  # positions closed concurrently
+    FLATTEN_TIMEOUT = 60  # seconds to keep retrying before giving up
+    FLATTEN_POLL_INTERVAL = 0.25  # seconds between checks that the book is empty
+    FLATTEN_CONFIRM_TIMEOUT = 3  # seconds to wait for a close to show before resending it
+
+    # Scheduling
+    CANDLE_CLOSE_BUFFER = float(os.getenv('CANDLE_CLOSE_BUFFER', '0.5'))  # seconds after close before evaluating
+    CLOCK_SYNC_INTERVAL = 3600  # re-estimate the exchange clock offset hourly
+    LATENCY_HISTORY = 500  # cycles of latency kept for percentiles
+
+    # Trade Journal
+    JOURNAL_PATH = os.getenv('JOURNAL_PATH', 'trade_journal.bin')
+    JOURNAL_FLUSH_INTERVAL = 1.0  # seconds between batched fsyncs
+    JOURNAL_MAX_RECORDS = 500_000  # in-memory cap (~43 MB); oldest records are evicted, the file keeps all
+
+    # Memory
+    MEMORY_TRACE = os.getenv('MEMORY_TRACE', 'False').lower() == 'true'  # tracemalloc from startup
+    MEMORY_TRACE_FRAMES = 1
+    MEMORY_SAMPLE_INTERVAL = 60  # seconds between RSS / object-count samples
+    MEMORY_HISTORY = 1440  # samples kept (one day at the default interval)
+    ORDER_BOOK_MAX_BOOKS = 100  # local books kept, including untracked ones loaded on demand
+
+    # Deployment
+    DEPLOY_MODE = os.getenv('DEPLOY_MODE', 'single')  # 'single' (one process) or 'split' (engine and web processes)
+    STATE_SHM_NAME = os.getenv('STATE_SHM_NAME', 'blofin_bot_state')
+    STATE_SHM_SIZE = 1 << 20  # bytes reserved for the published engine state
+    STATE_PUBLISH_INTERVAL = 1.0  # seconds between state publications
+    STATE_POSITIONS_INTERVAL = 5  # seconds between position refreshes for the dashboard
+    ENGINE_RPC_HOST = '127.0.0.1'
+    ENGINE_RPC_PORT = int(os.getenv('ENGINE_RPC_PORT', '8765'))
+    ENGINE_RPC_AUTHKEY = os.getenv('ENGINE_RPC_AUTHKEY', '')  # generated by main.py when empty
+    ENGINE_RPC_TIMEOUT = 10  # seconds to wait for a command reply (flatten waits FLATTEN_TIMEOUT longer)
+    WEB_NICE = int(os.getenv('WEB_NICE', '10'))  # web process priority below the engine's when CPUs are scarce
+
+    # Simulation
+    SIM_INITIAL_BALANCE = float(os.getenv('SIM_INITIAL_BALANCE', '10000'))
+    SIM_TAKER_FEE = 0.0006  # 0.06% per fill
+    SIM_MAX_MESSAGES = 1000  # notifier messages kept by the simulator
+    SIM_MAX_TRADES = 1000  # closed trades kept for fill lookups; totals are counted separately
+    SIM_FUNDING_RATE = float(os.getenv('SIM_FUNDING_RATE', '0.0001'))  # per 8h settlement, all symbols
+
+    # Settings the dashboard may change at runtime, with their types
+    EDITABLE = {
+        'TIMEFRAME': str,
+        'POSITION_SIZE': float,
+        'LEVERAGE': int,
+        'ISOLATED': bool,
+        'MAX_POSITIONS': int,
+        'TOP_COINS_TO_SCAN': int,
+    }
+
+    @classmethod
+    def editable(cls) -> dict:
+        return {key: getattr(cls, key) for key in cls.EDITABLE}
+
+    @classmethod
+    def update(cls, values: dict):
+        """Apply dashboard settings; unknown keys are ignored"""
+        for key, cast in cls.EDITABLE.items():
+            if key in values:
+                setattr(cls, key, cast(values[key]))
 
     @classmethod
     def validate(cls):
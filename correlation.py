@@ -0,0 +1,274 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from candles import Candles, CANDLE_FIELDS
+from config import Config
+from utils import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+TS = CANDLE_FIELDS.index('timestamp')
+CLOSE = CANDLE_FIELDS.index('close')
+
+
+class RollingCorrelation:
+    """Rolling pairwise return correlation across the monitored universe
+
+    Log returns are kept in a ring buffer of `window` candle rows by `capacity`
+    symbol columns. Alongside it the pairwise sums needed for a pairwise-complete
+    Pearson correlation (overlap count, sum of x, sum of x², sum of xy) are kept
+    as capacity x capacity matrices, so each new candle costs four outer-product
+    updates instead of a full recomputation (the sums are rebuilt exactly once per
+    window). Symbols seen for the first time are backfilled from the candle
+    history already fetched by the scanner.
+    """
+
+    REBUILD_AFTER = 8  # backfilling more columns than this at once rebuilds all sums instead
+
+    def __init__(self, window: int = None, capacity: int = None):
+        self.window = window or Config.CORRELATION_WINDOW
+        self.capacity = capacity or Config.CORRELATION_MAX_SYMBOLS
+        self.timeframe: Optional[str] = None
+        self.reset()
+
+    def reset(self):
+        self.columns: Dict[str, int] = {}
+        self.last_seen = np.zeros(self.capacity, dtype=np.int64)
+        self.row_ts = np.full(self.window, -1, dtype=np.int64)  # candle timestamp of each ring row
+        self.returns = np.zeros((self.window, self.capacity))
+        self.mask = np.zeros((self.window, self.capacity))
+        self.count = np.zeros((self.capacity, self.capacity))  # rows where both i and j have a return
+        self.sum_x = np.zeros((self.capacity, self.capacity))  # sum of x_i over those rows
+        self.sum_xx = np.zeros((self.capacity, self.capacity))  # sum of x_i**2 over those rows
+        self.sum_xy = np.zeros((self.capacity, self.capacity))  # sum of x_i * x_j
+        self.head = 0  # next ring row to write
+        self.rows = 0
+        self.last_ts = -1
+
+    @staticmethod
+    def _returns(candles: Candles, period_ms: int):
+        """Log returns between consecutive candles, keyed by the later candle's timestamp"""
+        ts = candles['timestamp'].astype(np.int64)
+        close = candles.close
+        consecutive = np.diff(ts) == period_ms
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rets = np.diff(np.log(close))
+        valid = consecutive & np.isfinite(rets)
+        return ts[1:][valid], rets[valid]
+
+    def _push_rows(self, values: np.ndarray, present: np.ndarray, timestamps: np.ndarray):
+        """Append aligned return rows, retiring the oldest ones once the ring is full"""
+        rows = (self.head + np.arange(len(timestamps))) % self.window
+        retiring = rows[:max(0, self.rows + len(rows) - self.window)]
+        old_values, old_present = self.returns[retiring], self.mask[retiring]
+        self.returns[rows] = values
+        self.mask[rows] = present
+        self.row_ts[rows] = timestamps
+        self.rows = min(self.window, self.rows + len(rows))
+        self.head = (rows[-1] + 1) % self.window
+        self.last_ts = int(timestamps[-1])
+        if self.head <= rows[0] or self.head == 0:
+            self._rebuild()  # wrapped around
+            return
+        signs = np.concatenate([np.ones(len(rows)), -np.ones(len(retiring))])
+        self._accumulate(np.vstack([values, old_values]), np.vstack([present, old_present]), signs)
+
+    def _rebuild(self):
+        """Recompute the sums from the ring once per window so add/subtract rounding cannot drift"""
+        r, mask = self.returns, self.mask
+        self.count = mask.T @ mask
+        self.sum_x = r.T @ mask
+        self.sum_xx = (r * r).T @ mask
+        self.sum_xy = r.T @ r
+
+    def _accumulate(self, values: np.ndarray, present: np.ndarray, signs: np.ndarray):
+        """Add (sign +1) or remove (sign -1) rows from the sums as one rank-k matrix product each"""
+        weighted_present = present * signs[:, None]
+        self.count += present.T @ weighted_present
+        self.sum_x += values.T @ weighted_present
+        self.sum_xx += (values * values).T @ weighted_present
+        self.sum_xy += values.T @ (values * signs[:, None])
+
+    def _assign_column(self, symbol: str) -> int:
+        """Column for a new symbol, evicting the least recently seen one when full"""
+        if len(self.columns) < self.capacity:
+            used = set(self.columns.values())
+            col = next(c for c in range(self.capacity) if c not in used)
+        else:
+            col = int(np.argmin(self.last_seen))
+            evicted = next(s for s, c in self.columns.items() if c == col)
+            del self.columns[evicted]
+            logger.debug(f"Correlation universe full, evicted {evicted}")
+        self.columns[symbol] = col
+        self._clear_column(col)
+        return col
+
+    def _clear_column(self, col: int):
+        self.returns[:, col] = 0.0
+        self.mask[:, col] = 0.0
+        for matrix in (self.count, self.sum_x, self.sum_xx, self.sum_xy):
+            matrix[col, :] = 0.0
+            matrix[:, col] = 0.0
+
+    def _backfill(self, col: int, ts: np.ndarray, rets: np.ndarray):
+        """Fill a column from history for the ring rows it is missing (sums are refreshed separately)"""
+        if not len(ts):
+            return
+        idx = np.clip(np.searchsorted(ts, self.row_ts), 0, len(ts) - 1)
+        hit = (self.row_ts >= 0) & (ts[idx] == self.row_ts)
+        self.returns[:, col] = np.where(hit, rets[idx], self.returns[:, col])
+        self.mask[:, col] = np.maximum(self.mask[:, col], hit)
+
+    def _refresh_column(self, col: int):
+        """Recompute one symbol's row and column of the sums from the ring"""
+        x, m = self.returns[:, col], self.mask[:, col]
+        r, mask = self.returns, self.mask
+        self.count[col, :] = m @ mask
+        self.count[:, col] = self.count[col, :]
+        self.sum_x[col, :] = x @ mask          # sum of x_col where both present
+        self.sum_x[:, col] = r.T @ m           # sum of x_i where both present
+        self.sum_xx[col, :] = (x * x) @ mask
+        self.sum_xx[:, col] = (r * r).T @ m
+        self.sum_xy[col, :] = x @ r
+        self.sum_xy[:, col] = self.sum_xy[col, :]
+
+    def update(self, candles_by_symbol: Dict[str, Candles], timeframe: str, now: float = None):
+        """Fold the latest closed candles of every scanned symbol into the rolling sums
+
+        Live OHLCV ends with the still-forming bar, whose return would only cover the first
+        moments of the bar; pass `now` (seconds) and a last row opened less than half a
+        period ago is dropped. The common case, a known symbol with exactly one new candle
+        since the last update, is handled for all symbols at once from the last two rows of
+        each series; only new symbols, symbols that missed updates and multi-candle
+        catch-ups are handled per symbol.
+        """
+        if timeframe != self.timeframe:
+            self.reset()
+            self.timeframe = timeframe
+        period_ms = timeframe_to_seconds(timeframe) * 1000
+        candles_by_symbol = {symbol: candles for symbol, candles in candles_by_symbol.items()
+                             if candles is not None and len(candles)}
+        if now is not None:
+            # Half a period of tolerance keeps a just-closed bar despite local clock skew
+            forming_after = now * 1000 - period_ms / 2
+            candles_by_symbol = {
+                symbol: (Candles(candles.data[:-1], candles.symbol, candles.timeframe)
+                         if candles.data['timestamp'][-1] > forming_after else candles)
+                for symbol, candles in candles_by_symbol.items()
+            }
+        candles_by_symbol = {symbol: candles for symbol, candles in candles_by_symbol.items()
+                             if len(candles) >= 2}
+        if not candles_by_symbol:
+            return
+
+        symbols = list(candles_by_symbol)
+        # Last two rows of every series as one plain float block (viewing avoids structured-dtype concatenation)
+        tails = np.concatenate([candles.data[-2:].view(np.float64) for candles in candles_by_symbol.values()])
+        tails = tails.reshape(len(symbols), 2, len(CANDLE_FIELDS))
+        tail_ts = tails[:, :, TS].astype(np.int64)
+        tail_close = tails[:, :, CLOSE]
+        cols = np.array([self.columns.get(symbol, -1) for symbol in symbols])
+        next_ts = self.last_ts + period_ms
+        fast = ((cols >= 0) & (self.last_seen[cols] == self.last_ts) &
+                (tail_ts[:, 0] == self.last_ts) & (tail_ts[:, 1] == next_ts))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fast_rets = np.log(tail_close[:, 1] / tail_close[:, 0])
+        fast &= np.isfinite(fast_rets)
+
+        series = {symbols[i]: self._returns(candles_by_symbol[symbols[i]], period_ms)
+                  for i in np.flatnonzero(~fast)}
+
+        # New rows, oldest first; each is aligned across every symbol that has a return for it
+        pending = [ts[ts > self.last_ts] for ts, _ in series.values()]
+        if fast.any():
+            pending.append(np.array([next_ts]))
+        new_ts = np.unique(np.concatenate(pending))[-self.window:] if pending else np.empty(0, np.int64)
+        if len(new_ts):
+            values = np.zeros((len(new_ts), self.capacity))
+            present = np.zeros((len(new_ts), self.capacity))
+            if fast.any():
+                row = np.searchsorted(new_ts, next_ts)
+                values[row, cols[fast]] = fast_rets[fast]
+                present[row, cols[fast]] = 1.0
+            for symbol, (ts, rets) in series.items():
+                col = self.columns.get(symbol)
+                if col is None or not len(ts):
+                    continue
+                idx = np.clip(np.searchsorted(ts, new_ts), 0, len(ts) - 1)
+                hit = ts[idx] == new_ts
+                values[hit, col] = rets[idx[hit]]
+                present[hit, col] = 1.0
+            previous_ts = self.last_ts
+            self._push_rows(values, present, new_ts)
+        else:
+            previous_ts = self.last_ts
+
+        self.last_seen[cols[fast]] = self.last_ts
+        backfilled = []
+        for symbol, (ts, rets) in series.items():
+            col = self.columns.get(symbol)
+            if col is None:
+                # Symbols entering the universe get their column from history
+                col = self._assign_column(symbol)
+                self._backfill(col, ts, rets)
+                backfilled.append(col)
+            elif self.last_seen[col] < previous_ts:
+                # Missed earlier updates; its history now covers those rows
+                self._backfill(col, ts, rets)
+                backfilled.append(col)
+            self.last_seen[col] = self.last_ts
+        if len(backfilled) > self.REBUILD_AFTER:
+            self._rebuild()
+        else:
+            for col in backfilled:
+                self._refresh_column(col)
+
+    def correlation(self, symbols: List[str]) -> np.ndarray:
+        """Pairwise correlation matrix for symbols; NaN where the overlap is too short or unknown"""
+        cols = np.array([self.columns.get(symbol, -1) for symbol in symbols])
+        known = cols >= 0
+        result = np.full((len(symbols), len(symbols)), np.nan)
+        if not known.any():
+            return result
+        ix = np.ix_(cols[known], cols[known])
+        n, sx, sxx, sxy = self.count[ix], self.sum_x[ix], self.sum_xx[ix], self.sum_xy[ix]
+        sy, syy = sx.T, sxx.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        corr[n < Config.CORRELATION_MIN_PERIODS] = np.nan
+        result[np.ix_(known, known)] = np.clip(corr, -1.0, 1.0)
+        return result
+
+
+def select_decorrelated(candidates: List[Dict], held: List[Dict], corr: RollingCorrelation,
+                        slots: int, threshold: float = None) -> List[Dict]:
+    """Pick up to `slots` candidates, best first, whose bets are not correlated with each other or held positions
+
+    Candidates are dicts with 'symbol' and a signal 'action', already ordered best first;
+    held entries carry 'symbol' and 'side'. Correlation is signed by direction, so a long and
+    a short on two correlated coins count as a hedge rather than a doubled bet. Pairs without
+    enough shared history are treated as uncorrelated.
+    """
+    threshold = Config.CORRELATION_THRESHOLD if threshold is None else threshold
+    if slots <= 0 or not candidates:
+        return []
+
+    symbols = [c['symbol'] for c in candidates] + [h['symbol'] for h in held]
+    direction = np.array([1.0 if c['signal']['action'] == 'long' else -1.0 for c in candidates] +
+                         [1.0 if h.get('side') == 'long' else -1.0 for h in held])
+    exposure = corr.correlation(symbols) * np.outer(direction, direction)
+    blocking = np.nan_to_num(exposure, nan=0.0) > threshold
+
+    k = len(candidates)
+    allowed = ~blocking[:k, k:].any(axis=1)  # clashes with an open position
+    chosen = []
+    for i in range(k):
+        if not allowed[i]:
+            continue
+        chosen.append(candidates[i])
+        if len(chosen) == slots:
+            break
+        allowed &= ~blocking[i, :k]
+    return chosen
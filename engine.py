@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bot_control import bot_controller
+from config import Config
+from exchange import BlofingExchange
+from indicators import indicator_graph
+from ipc import RpcClient, RpcServer, StatePublisher, StateReader
+from journal import get_journal, ORDER, SIGNAL
+from memory import memory_monitor
+from resilience import resilience
+from scanner import CoinScanner, latest_scan
+from trading_bot import run_trading_bot
+from utils import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+POSITION_FIELDS = ('symbol', 'side', 'contracts', 'entryPrice', 'unrealizedPnl')
+
+
+def _rpc_address():
+    return (Config.ENGINE_RPC_HOST, Config.ENGINE_RPC_PORT)
+
+
+def _scan_max_age() -> float:
+    """Age after which the monitored coins no longer reflect the current candles"""
+    return 2 * timeframe_to_seconds(Config.TIMEFRAME)
+
+
+def _scan_errors(updated_at: Optional[float], now: float) -> List[str]:
+    if updated_at is not None and now - updated_at > _scan_max_age():
+        return [f"Monitored coins are from a scan {(now - updated_at) / 60:.0f} min ago"]
+    return []
+
+
+class EngineControl:
+    """Everything the dashboard reads from or does to the trading engine, run in the engine's process
+
+    In single-process mode the web server calls this directly; in split mode the engine
+    process serves the same methods over RPC and `RemoteEngine` stands in for it.
+    """
+
+    def __init__(self, exchange=None, bot_function: Callable = None):
+        self._exchange = exchange
+        self.bot_function = bot_function or run_trading_bot
+        self._rescan_lock = threading.Lock()
+        self._rescanned_at = 0.0
+
+    @property
+    def exchange(self):
+        """One exchange client shared by all dashboard requests instead of one per page view"""
+        if self._exchange is None:
+            self._exchange = BlofingExchange()
+        return self._exchange
+
+    def refresh_monitored_coins(self):
+        """Rescan when the trading loop's scan is missing or stale, i.e. the bot is stopped or full
+
+        At most one rescan per scan max age, so a failing or empty scan is not retried on every call.
+        """
+        now = time.time()
+        _, updated_at = latest_scan.snapshot()
+        if updated_at is not None and now - updated_at <= _scan_max_age():
+            return
+        if now - self._rescanned_at < _scan_max_age() or not self._rescan_lock.acquire(blocking=False):
+            return
+        try:
+            self._rescanned_at = now
+            coins = CoinScanner(self.exchange, Config).get_monitored_coins()
+            if coins:
+                latest_scan.update(coins)
+        finally:
+            self._rescan_lock.release()
+
+    def monitored_coins(self) -> Tuple[List[Dict], Optional[float]]:
+        """Latest monitored coins and the time they were scanned (None if never)"""
+        self.refresh_monitored_coins()
+        return latest_scan.snapshot()
+
+    def positions(self) -> List[Dict]:
+        return [{field: position.get(field) for field in POSITION_FIELDS}
+                for position in self.exchange.get_positions()]
+
+    def status(self) -> Dict:
+        """Cheap in-memory state; no exchange calls"""
+        return {
+            'bot_running': bot_controller.is_running(),
+            'config': Config.editable(),
+            'exchange_health': resilience.status(),
+            'indicator_stats': indicator_graph.stats(),
+        }
+
+    def dashboard(self) -> Dict:
+        """Status plus monitored coins and positions; 'errors' lists what could not be fetched"""
+        state = {'monitored_coins': [], 'monitored_coins_at': None, 'positions': [], 'errors': []}
+        try:
+            state['monitored_coins'], state['monitored_coins_at'] = self.monitored_coins()
+            state['errors'].extend(_scan_errors(state['monitored_coins_at'], time.time()))
+        except Exception as e:
+            logger.error(f"Error fetching monitored coins: {str(e)}")
+            state['errors'].append("Error fetching monitored coins. Please check the logs.")
+        try:
+            state['positions'] = self.positions()
+        except Exception as e:
+            logger.error(f"Error fetching positions: {str(e)}")
+            state['errors'].append("Error fetching positions. Please check the logs.")
+        state.update(self.status())
+        return state
+
+    def start_bot(self) -> bool:
+        return bot_controller.start_bot(self.bot_function)
+
+    def stop_bot(self) -> bool:
+        return bot_controller.stop_bot()
+
+    def update_config(self, values: Dict):
+        Config.update(values)
+        logger.info(f"Configuration updated: {values}")
+
+    def emergency_flatten(self) -> Dict:
+        return bot_controller.emergency_flatten(self.exchange)
+
+    def analytics(self, days: int) -> Dict:
+        since = int((time.time() - days * 86400) * 1000)
+        journal = get_journal()
+        return {
+            'summary': journal.summary(since=since),
+            'by_symbol': journal.pnl_by_symbol(since=since),
+            'signal_latency': journal.latency_percentiles(SIGNAL, since=since),
+            'order_latency': journal.latency_percentiles(ORDER, since=since),
+            'recent': journal.recent(50),
+        }
+
+    def memory_status(self) -> Dict:
+        return memory_monitor.status()
+
+    def memory_snapshot(self, limit: int = 25) -> Dict:
+        return memory_monitor.snapshot(limit)
+
+    def memory_diff(self, limit: int = 25) -> Dict:
+        return memory_monitor.diff(limit)
+
+
+class TradingEngine:
+    """Engine side of split deployment: publishes dashboard state to shared memory and serves control RPC
+
+    Positions are refreshed on their own interval and monitored coins are taken from the
+    trading loop's own scan, so page views in the web process cost the engine nothing but
+    a read of the shared block. While the loop is not scanning (bot stopped or full), a
+    background thread rescans once the snapshot goes stale; publishing never waits on it.
+    """
+
+    COMMANDS = ('start_bot', 'stop_bot', 'update_config', 'emergency_flatten', 'analytics',
+                'memory_status', 'memory_snapshot', 'memory_diff')
+
+    def __init__(self, control: EngineControl = None):
+        self.control = control or EngineControl()
+        if not Config.ENGINE_RPC_AUTHKEY:
+            raise ValueError("ENGINE_RPC_AUTHKEY must be set for split deployment")
+        self.publisher = StatePublisher(Config.STATE_SHM_NAME, Config.STATE_SHM_SIZE)
+        self.rpc = RpcServer({name: getattr(self.control, name) for name in self.COMMANDS},
+                             _rpc_address(), Config.ENGINE_RPC_AUTHKEY.encode())
+        self._positions: List[Dict] = []
+        self._positions_at = 0.0
+        self._coins: List[Dict] = []
+        self._coins_at = None
+        self._errors: Dict[str, str] = {}
+        self._stopped = threading.Event()
+
+    def _refresh(self, now: float):
+        if now - self._positions_at >= Config.STATE_POSITIONS_INTERVAL:
+            self._positions_at = now
+            try:
+                self._positions = self.control.positions()
+                self._errors.pop('positions', None)
+            except Exception as e:
+                logger.error(f"Error fetching positions: {str(e)}")
+                self._errors['positions'] = "Error fetching positions. Please check the logs."
+        try:
+            coins, updated_at = latest_scan.snapshot()
+            if updated_at is not None and updated_at != self._coins_at:
+                self._coins, self._coins_at = coins, updated_at
+        except Exception as e:
+            logger.error(f"Error reading monitored coins: {str(e)}")
+
+    def _rescan_loop(self):
+        while not self._stopped.wait(Config.STATE_POSITIONS_INTERVAL):
+            try:
+                self.control.refresh_monitored_coins()
+            except Exception as e:
+                logger.error(f"Error refreshing monitored coins: {str(e)}")
+
+    def collect_state(self) -> Dict:
+        now = time.time()
+        self._refresh(now)
+        state = self.control.status()
+        state.update({
+            'published_at': now,
+            'positions': self._positions,
+            'monitored_coins': self._coins,
+            'monitored_coins_at': self._coins_at,
+            'errors': list(self._errors.values()) + _scan_errors(self._coins_at, now),
+        })
+        return state
+
+    def publish(self):
+        try:
+            self.publisher.publish(self.collect_state())
+        except Exception as e:
+            logger.error(f"Failed to publish engine state: {str(e)}")
+
+    def start(self):
+        self.publish()
+        self.rpc.start()
+        rescan = threading.Thread(target=self._rescan_loop, name='engine-rescan')
+        rescan.daemon = True
+        rescan.start()
+
+    def close(self):
+        self._stopped.set()
+        self.rpc.stop()
+        self.publisher.close()
+
+
+class RemoteEngine:
+    """Web side of split deployment: reads published state and forwards commands to the engine process"""
+
+    def __init__(self):
+        self.reader = StateReader(Config.STATE_SHM_NAME)
+        self.client = RpcClient(_rpc_address(), Config.ENGINE_RPC_AUTHKEY.encode(), Config.ENGINE_RPC_TIMEOUT)
+
+    def dashboard(self) -> Dict:
+        try:
+            state = self.reader.read()
+        except Exception as e:
+            logger.error(f"Error reading engine state: {str(e)}")
+            self.reader.close()  # reattach if the engine restarted
+            state = None
+        if state is None:
+            return {'monitored_coins': [], 'monitored_coins_at': None, 'positions': [], 'bot_running': False,
+                    'config': Config.editable(), 'exchange_health': resilience.status(),
+                    'indicator_stats': indicator_graph.stats(),
+                    'errors': ["Trading engine is not running"]}
+        age = time.time() - state['published_at']
+        if age > Config.STATE_PUBLISH_INTERVAL * 5:
+            state['errors'].append(f"Trading engine state is {age:.0f}s old")
+        return state
+
+    def start_bot(self) -> bool:
+        return self.client.call('start_bot')
+
+    def stop_bot(self) -> bool:
+        return self.client.call('stop_bot')
+
+    def update_config(self, values: Dict):
+        self.client.call('update_config', values=values)
+
+    def emergency_flatten(self) -> Dict:
+        return self.client.call('emergency_flatten',
+                                timeout=Config.FLATTEN_TIMEOUT + Config.ENGINE_RPC_TIMEOUT)
+
+    def analytics(self, days: int) -> Dict:
+        return self.client.call('analytics', days=days)
+
+    def memory_status(self) -> Dict:
+        return self.client.call('memory_status')
+
+    def memory_snapshot(self, limit: int = 25) -> Dict:
+        return self.client.call('memory_snapshot', limit=limit)
+
+    def memory_diff(self, limit: int = 25) -> Dict:
+        return self.client.call('memory_diff', limit=limit)
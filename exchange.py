@@ -1,16 +1,19 @@
 import ccxt
 import pandas as pd
-import time
+import uuid
 from typing import Dict, List
 from config import Config
+from candles import Candles
+from resilience import resilience, trade_limiter
 import logging
 
 class BlofingExchange:
+    BATCH_CANCEL_SIZE = 20  # orders per batch cancel request
+
     def __init__(self):
         self.exchange = self._initialize_exchange()
         self.logger = logging.getLogger(__name__)
-        self.MAX_RETRIES = 3
-        self.RETRY_DELAY = 5  # seconds
+        self.order_books = None  # Optional OrderBookManager used for pre-trade slippage checks
 
     def _initialize_exchange(self):
         """Initialize exchange with retries"""
@@ -24,23 +27,33 @@ class BlofingExchange:
         exchange.set_sandbox_mode(True)  # Use demo account
         return exchange
 
-    def _handle_request(self, operation, *args, **kwargs):
-        """Handle exchange requests with retry logic"""
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                return operation(*args, **kwargs)
-            except ccxt.NetworkError as e:
-                if attempt == self.MAX_RETRIES - 1:
-                    raise
-                self.logger.warning(f"Network error, retrying... ({attempt + 1}/{self.MAX_RETRIES})")
-                time.sleep(self.RETRY_DELAY)
-            except ccxt.ExchangeError as e:
-                if 'unauthorized' in str(e).lower():
-                    self.exchange = self._initialize_exchange()
-                if attempt == self.MAX_RETRIES - 1:
-                    raise
-                self.logger.warning(f"Exchange error, retrying... ({attempt + 1}/{self.MAX_RETRIES})")
-                time.sleep(self.RETRY_DELAY)
+    def _handle_request(self, operation, *args, idempotent: bool = True, endpoint: str = None,
+                        limiter=None, **kwargs):
+        """Handle exchange requests through the per-endpoint resilience layer
+
+        Idempotent reads get backoff retries and hedging; non-idempotent calls are only
+        retried on network errors and must carry a client order ID. Trading calls pass
+        `trade_limiter`, which is charged on every attempt. Breakers and latency
+        are tracked per endpoint: unified ccxt methods are named after themselves, but
+        implicit API methods all share the name 'unbound_method', so those calls must
+        pass `endpoint`.
+        """
+        name = endpoint or operation.__name__
+        if name == 'unbound_method':
+            raise ValueError("Implicit API calls need an explicit endpoint name")
+        return resilience.call(name, operation, *args, idempotent=idempotent, limiter=limiter, **kwargs)
+
+    def _find_order_by_client_id(self, symbol: str, client_order_id: str) -> Dict:
+        """Look up an order placed by an earlier attempt with the same client order ID"""
+        market = self.exchange.market(symbol)
+        for endpoint, extra in (('private_get_trade_orders_pending', {}),
+                                ('private_get_trade_orders_history', {'limit': '100'})):
+            response = self._handle_request(getattr(self.exchange, endpoint), {'instId': market['id'], **extra},
+                                            endpoint=endpoint)
+            for raw in response.get('data', []):
+                if raw.get('clientOrderId') == client_order_id:
+                    return self.exchange.parse_order(raw, market)
+        raise Exception(f"Order {client_order_id} reported as duplicate but not found")
 
     def create_order(self, symbol: str, order_type: str, side: str, amount: float, 
                     price: float = None, params: Dict = None) -> Dict:
@@ -64,6 +77,9 @@ class BlofingExchange:
             position_size_usd = amount * Config.LEVERAGE
             quantity = position_size_usd / current_price
 
+            if order_type == 'market' and self.order_books is not None:
+                quantity = self._fit_to_book(symbol, side, quantity, current_price)
+
             # Prepare order parameters
             default_params = {
                 'marginMode': 'isolated' if Config.ISOLATED else 'cross',
@@ -91,18 +107,28 @@ class BlofingExchange:
                     self.logger.info(f"Setting TP price to: {tp_price}")
 
             merged_params = {**default_params, **(params or {})}
+            # A stable client order ID makes retries safe: the exchange rejects duplicates
+            merged_params.setdefault('clientOrderId', uuid.uuid4().hex)
             self.logger.info(f"Creating order with params: {merged_params}")
 
             # Create the order with retry logic
-            order = self._handle_request(
-                self.exchange.create_order,
-                symbol=symbol,
-                type=order_type,
-                side=side,
-                amount=quantity,  # Use the calculated quantity
-                price=price,
-                params=merged_params
-            )
+            try:
+                order = self._handle_request(
+                    self.exchange.create_order,
+                    symbol=symbol,
+                    type=order_type,
+                    side=side,
+                    amount=quantity,  # Use the calculated quantity
+                    price=price,
+                    params=merged_params,
+                    idempotent=False,
+                    limiter=trade_limiter
+                )
+            except ccxt.InvalidOrder as e:
+                if '102002' not in str(e) and '150003' not in str(e):
+                    raise
+                self.logger.warning(f"Order {merged_params['clientOrderId']} already placed by an earlier attempt")
+                order = self._find_order_by_client_id(symbol, merged_params['clientOrderId'])
 
             self.logger.info(f"Order created successfully: {order}")
             return order
@@ -111,16 +137,92 @@ class BlofingExchange:
             self.logger.error(f"Order creation failed: {str(e)}")
             raise
 
-    def fetch_ohlcv(self, symbol: str, timeframe: str) -> pd.DataFrame:
-        """Fetch OHLCV data with retry logic"""
+    def _fit_to_book(self, symbol: str, side: str, quantity: float, reference_price: float) -> float:
+        """Resize a market order so its expected VWAP stays within MAX_SLIPPAGE of the reference price"""
+        book = self.order_books.get_book(symbol)
+        if book is None:
+            self.logger.warning(f"No order book for {symbol}, skipping slippage check")
+            return quantity
+
+        vwap, filled = book.estimate_fill(side, quantity)
+        if vwap is not None and filled >= quantity:
+            slippage = abs(vwap - reference_price) / reference_price
+            self.logger.info(f"Expected VWAP for {symbol}: {vwap:.6f} (slippage {slippage:.4%})")
+            if slippage <= Config.MAX_SLIPPAGE:
+                return quantity
+
+        if side == 'buy':
+            vwap_limit = reference_price * (1 + Config.MAX_SLIPPAGE)
+        else:
+            vwap_limit = reference_price * (1 - Config.MAX_SLIPPAGE)
+        fitted = min(quantity, book.max_amount_for_vwap(side, vwap_limit))
+
+        if fitted < quantity * Config.MIN_FILL_RATIO:
+            raise ValueError(f"Insufficient depth for {symbol}: only {fitted:.6f} of {quantity:.6f} "
+                             f"fillable within {Config.MAX_SLIPPAGE:.2%} slippage")
+
+        self.logger.info(f"Resizing {symbol} order from {quantity:.6f} to {fitted:.6f} to stay within slippage limit")
+        return fitted
+
+    def fetch_closing_fills(self, symbol: str, position_side: str, since: int) -> List[Dict]:
+        """Fills since `since` (ms) that reduced a position of the given side"""
+        try:
+            market = self.exchange.market(symbol)
+            response = self._handle_request(self.exchange.private_get_trade_fills_history,
+                                            {'instId': market['id'], 'begin': str(since), 'limit': '100'},
+                                            endpoint='private_get_trade_fills_history')
+            closing_side = 'sell' if position_side == 'long' else 'buy'
+            return [
+                {
+                    'price': float(fill['fillPrice']),
+                    'quantity': float(fill['fillSize']),
+                    'pnl': float(fill.get('fillPnl') or 0),
+                    'fee': float(fill.get('fee') or 0),
+                    'ts': int(fill['ts']),
+                }
+                for fill in response.get('data', []) if fill.get('side') == closing_side
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to fetch fills: {str(e)}")
+
+    def fetch_server_time(self) -> int:
+        """Exchange time in milliseconds, taken from the mark price response timestamp"""
+        response = self._handle_request(self.exchange.public_get_market_mark_price, {'instId': 'BTC-USDT'},
+                                        endpoint='public_get_market_mark_price')
+        return int(response['data'][0]['ts'])
+
+    def fetch_funding_snapshot(self) -> Dict[str, Dict]:
+        """Funding rate, next settlement time and mark price of every instrument, in two bulk requests"""
+        try:
+            self.exchange.load_markets()
+            funding = self._handle_request(self.exchange.public_get_market_funding_rate, {},
+                                           endpoint='public_get_market_funding_rate').get('data', [])
+            marks = self._handle_request(self.exchange.public_get_market_mark_price, {},
+                                         endpoint='public_get_market_mark_price').get('data', [])
+            mark_prices = {row['instId']: float(row['markPrice']) for row in marks if row.get('markPrice')}
+            return {
+                self.exchange.safe_symbol(row['instId']): {
+                    'funding_rate': float(row['fundingRate']),
+                    'funding_time': int(row['fundingTime']),
+                    'mark_price': mark_prices.get(row['instId'], float('nan')),
+                }
+                for row in funding if row.get('fundingRate')
+            }
+        except Exception as e:
+            raise Exception(f"Failed to fetch funding rates: {str(e)}")
+
+    def fetch_candles(self, symbol: str, timeframe: str) -> Candles:
+        """Fetch OHLCV data into the array-backed `Candles` container with retry logic"""
         try:
             ohlcv = self._handle_request(self.exchange.fetch_ohlcv, symbol, timeframe)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            return Candles.from_ohlcv(ohlcv, symbol, timeframe)
         except Exception as e:
             raise Exception(f"Failed to fetch OHLCV data: {str(e)}")
 
+    def fetch_ohlcv(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        """Fetch OHLCV data as a DataFrame (adapter over `fetch_candles`)"""
+        return self.fetch_candles(symbol, timeframe).to_dataframe()
+
     def set_leverage(self, symbol: str, leverage: int):
         """Set leverage with retry logic"""
         try:
@@ -139,4 +241,58 @@ class BlofingExchange:
                 positions = self._handle_request(self.exchange.fetch_positions)
             return [pos for pos in positions if float(pos['contracts']) > 0]
         except Exception as e:
-            raise Exception(f"Failed to fetch positions: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to fetch positions: {str(e)}")
+
+    def fetch_pending_orders(self, tpsl: bool = False) -> List[Dict]:
+        """All active orders, or untriggered TP/SL orders, across instruments in raw exchange format"""
+        try:
+            if tpsl:
+                endpoint, id_key = 'private_get_trade_orders_tpsl_pending', 'tpslId'
+            else:
+                endpoint, id_key = 'private_get_trade_orders_pending', 'orderId'
+            method = getattr(self.exchange, endpoint)
+            orders = []
+            params = {'limit': '100'}
+            while True:
+                page = self._handle_request(method, dict(params), endpoint=endpoint).get('data', [])
+                orders.extend(page)
+                if len(page) < 100:
+                    return orders
+                params['after'] = page[-1][id_key]
+        except Exception as e:
+            raise Exception(f"Failed to fetch pending orders: {str(e)}")
+
+    def cancel_orders_batch(self, orders: List[Dict], tpsl: bool = False) -> int:
+        """Cancel raw pending orders through the batch endpoints; returns how many were cancelled"""
+        if tpsl:
+            endpoint, id_key = 'private_post_trade_cancel_tpsl', 'tpslId'
+        else:
+            endpoint, id_key = 'private_post_trade_cancel_batch_orders', 'orderId'
+        method = getattr(self.exchange, endpoint)
+        cancelled = 0
+        for start in range(0, len(orders), self.BATCH_CANCEL_SIZE):
+            batch = [{'instId': order['instId'], id_key: order[id_key]}
+                     for order in orders[start:start + self.BATCH_CANCEL_SIZE]]
+            try:
+                response = self._handle_request(method, batch, idempotent=False, endpoint=endpoint,
+                                                limiter=trade_limiter)
+            except Exception as e:
+                # A partially failed batch is reported as an error; the caller re-lists and retries
+                self.logger.error(f"Batch cancel of {len(batch)} orders failed: {str(e)}")
+                continue
+            cancelled += sum(1 for item in response.get('data', []) if str(item.get('code', '0')) == '0')
+        return cancelled
+
+    def close_position(self, symbol: str, margin_mode: str = None) -> Dict:
+        """Close the whole position on symbol with a market order"""
+        try:
+            market = self.exchange.market(symbol)
+            response = self._handle_request(self.exchange.private_post_trade_close_position, {
+                'instId': market['id'],
+                'marginMode': margin_mode or ('isolated' if Config.ISOLATED else 'cross'),
+                'positionSide': 'net',
+                'clientOrderId': uuid.uuid4().hex,
+            }, idempotent=False, endpoint='private_post_trade_close_position', limiter=trade_limiter)
+            return response.get('data', {})
+        except Exception as e:
+            raise Exception(f"Failed to close position: {str(e)}")
@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+from clock import system_clock
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class FundingCache:
+    """Funding rates and mark prices of the whole market, refreshed on the funding schedule
+
+    The exchange serves both for every instrument in one request each, so a refresh costs
+    two calls however many symbols are scanned. A rate only settles at its funding time, so
+    the cache is refreshed once the earliest cached settlement has passed, or after
+    FUNDING_MAX_AGE to follow drift in the predicted rate. Values are kept as arrays
+    indexed by symbol so a batch of candidates is joined in one vectorised lookup.
+    """
+
+    def __init__(self, exchange, clock=None):
+        self.exchange = exchange
+        self.clock = clock or system_clock
+        self.index: Dict[str, int] = {}
+        self.rates = np.empty(0)
+        self.funding_times = np.empty(0, dtype=np.int64)
+        self.mark_prices = np.empty(0)
+        self.fetched_at = None
+        self.next_refresh = 0.0
+
+    def refresh(self):
+        snapshot = self.exchange.fetch_funding_snapshot()
+        now = self.clock.time()
+        rows = list(snapshot.values())
+        self.index = {symbol: i for i, symbol in enumerate(snapshot)}
+        self.rates = np.array([row['funding_rate'] for row in rows], dtype=float)
+        self.funding_times = np.array([row['funding_time'] for row in rows], dtype=np.int64)
+        self.mark_prices = np.array([row['mark_price'] for row in rows], dtype=float)
+        self.fetched_at = now
+
+        upcoming = self.funding_times[self.funding_times > now * 1000]
+        until_settlement = upcoming.min() / 1000 - now if len(upcoming) else 0.0
+        # Until the exchange rolls over to the next interval, check back every FUNDING_RETRY_DELAY
+        self.next_refresh = now + min(max(until_settlement, Config.FUNDING_RETRY_DELAY), Config.FUNDING_MAX_AGE)
+        logger.info(f"Funding rates refreshed for {len(rows)} instruments, "
+                    f"next refresh in {self.next_refresh - now:.0f}s")
+
+    def ensure_fresh(self):
+        now = self.clock.time()
+        if now < self.next_refresh:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Funding refresh failed, keeping {len(self.index)} cached rates: {str(e)}")
+            self.next_refresh = now + Config.FUNDING_RETRY_DELAY
+
+    def join(self, symbols: List[str]) -> Dict[str, np.ndarray]:
+        """Funding rate, settlement time and mark price per symbol; NaN (time -1) where unknown"""
+        if not self.index:
+            return {'funding_rate': np.full(len(symbols), np.nan),
+                    'funding_time': np.full(len(symbols), -1, dtype=np.int64),
+                    'mark_price': np.full(len(symbols), np.nan)}
+        rows = np.array([self.index.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+        known = rows >= 0
+        rows = np.where(known, rows, 0)
+        return {
+            'funding_rate': np.where(known, self.rates[rows], np.nan),
+            'funding_time': np.where(known, self.funding_times[rows], -1),
+            'mark_price': np.where(known, self.mark_prices[rows], np.nan),
+        }
+
+    def filter_adverse(self, candidates: List[Dict], max_cost: float = None) -> List[Dict]:
+        """Candidates whose funding payment per settlement is at most max_cost, annotated with the joined values
+
+        Longs pay a positive rate and shorts a negative one, so the cost is the rate signed
+        by direction; a negative cost means the trade is paid to hold. Symbols without a
+        cached rate are kept.
+        """
+        max_cost = Config.FUNDING_MAX_COST if max_cost is None else max_cost
+        if not candidates:
+            return []
+        self.ensure_fresh()
+
+        joined = self.join([c['symbol'] for c in candidates])
+        direction = np.array([1.0 if c['signal']['action'] == 'long' else -1.0 for c in candidates])
+        cost = joined['funding_rate'] * direction
+        keep = ~(cost > max_cost)  # NaN compares False, so unknown symbols pass
+
+        columns = zip(joined['funding_rate'].tolist(), joined['funding_time'].tolist(), joined['mark_price'].tolist())
+        for candidate, (rate, funding_time, mark_price) in zip(candidates, columns):
+            candidate.update(funding_rate=rate, funding_time=funding_time, mark_price=mark_price)
+        return [candidate for candidate, kept in zip(candidates, keep.tolist()) if kept]
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from candles import Candles, sma, ema
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Indicator:
+    """Node of the indicator graph: a hashable key, the nodes it reads and how to compute it
+
+    `fn` is called with the candles followed by the values of `deps`, in order.
+    """
+    __slots__ = ('key', 'fn', 'deps')
+
+    def __init__(self, key: Tuple, fn: Callable, deps: Tuple['Indicator', ...] = ()):
+        self.key = key
+        self.fn = fn
+        self.deps = deps
+
+    def __repr__(self) -> str:
+        return f"Indicator{self.key}"
+
+
+@lru_cache(maxsize=64)
+def sma_node(period: int) -> Indicator:
+    return Indicator(('sma', period), lambda candles: sma(candles.close, period))
+
+
+@lru_cache(maxsize=64)
+def ema_node(span: int) -> Indicator:
+    return Indicator(('ema', span), lambda candles: ema(candles.close, span))
+
+
+@lru_cache(maxsize=64)
+def bands_node(sma_period: int, ema_period: int) -> Indicator:
+    """Upper and lower band arrays: the element-wise max and min of SMA and EMA"""
+    return Indicator(('bands', sma_period, ema_period),
+                     lambda candles, sma_values, ema_values: (np.fmax(sma_values, ema_values),
+                                                              np.fmin(sma_values, ema_values)),
+                     deps=(sma_node(sma_period), ema_node(ema_period)))
+
+
+class IndicatorGraph:
+    """Memoised indicator values shared by the trading loop and the dashboard
+
+    Values are cached per (symbol, timeframe, last candle timestamp), so every node is
+    computed once per candle no matter how many consumers read it. Because the last
+    candle from the exchange may still be forming, an entry also records the series
+    length, first timestamp and last close, and is recomputed if those change. The
+    least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or Config.INDICATOR_CACHE_SIZE
+        self._entries: 'OrderedDict[Tuple, Dict]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compute_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def value(self, candles: Candles, node: Indicator):
+        """Value of node for candles, computed at most once per candle for keyed candles"""
+        if candles.symbol is None or candles.empty:
+            return self._resolve(candles, node, {})
+
+        key = (candles.symbol, candles.timeframe, int(candles['timestamp'][-1]))
+        fingerprint = (len(candles), float(candles['timestamp'][0]), float(candles.close[-1]))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                entry = {'fingerprint': fingerprint, 'values': {}}
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entries.move_to_end(key)
+            return self._resolve(candles, node, entry['values'])
+
+    def _resolve(self, candles: Candles, node: Indicator, values: Dict):
+        cached = values.get(node.key)
+        if cached is not None:
+            self.hits += 1
+            self.saved_seconds += cached[1]
+            return cached[0]
+
+        self.misses += 1
+        inputs = [self._resolve(candles, dep, values) for dep in node.deps]
+        started = time.perf_counter()
+        result = node.fn(candles, *inputs)
+        elapsed = time.perf_counter() - started
+        self.compute_seconds += elapsed
+        # A hit on this node also saves recomputing its dependencies
+        values[node.key] = (result, elapsed + sum(values[dep.key][1] for dep in node.deps))
+        return result
+
+    def stats(self) -> Dict:
+        """Cache counters for the dashboard"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'compute_ms': self.compute_seconds * 1000,
+                'saved_ms': self.saved_seconds * 1000,
+            }
+
+
+# Global instance shared by the strategy, scanner and dashboard
+indicator_graph = IndicatorGraph()
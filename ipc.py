@@ -0,0 +1,156 @@
+import json
+import logging
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('<QQ')  # sequence number, payload length
+
+
+class StatePublisher:
+    """Single writer of a JSON document in a shared-memory block, guarded by a seqlock
+
+    The sequence number is odd while a write is in progress and bumped again when it
+    completes, so readers in other processes never need a lock: they retry whenever
+    the sequence is odd or changed while they copied the payload.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by an engine that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = self.shm.size - _HEADER.size
+        self.seq = 0
+        _HEADER.pack_into(self.shm.buf, 0, self.seq, 0)
+
+    def publish(self, state: Dict):
+        payload = json.dumps(state, default=str).encode()
+        if len(payload) > self.capacity:
+            raise ValueError(f"State of {len(payload)} bytes exceeds shared memory capacity {self.capacity}")
+        buf = self.shm.buf
+        self.seq += 1
+        _HEADER.pack_into(buf, 0, self.seq, 0)
+        buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self.seq += 1
+        _HEADER.pack_into(buf, 0, self.seq, len(payload))
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class StateReader:
+    """Reads the latest document published by a StatePublisher in another process"""
+
+    RETRIES = 100
+
+    def __init__(self, name: str):
+        self.name = name
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def read(self) -> Optional[Dict]:
+        """Latest state, or None if nothing has been published yet"""
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        buf = self.shm.buf
+        for _ in range(self.RETRIES):
+            seq, length = _HEADER.unpack_from(buf, 0)
+            if seq % 2:
+                time.sleep(0)
+                continue
+            payload = bytes(buf[_HEADER.size:_HEADER.size + length])
+            if _HEADER.unpack_from(buf, 0)[0] == seq:
+                return json.loads(payload) if length else None
+        raise TimeoutError("State kept changing while being read")
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+
+class RpcServer:
+    """Serves (command, kwargs) requests from authenticated local clients, one thread per connection"""
+
+    def __init__(self, handlers: Dict[str, Callable], address: Tuple[str, int], authkey: bytes):
+        self.handlers = handlers
+        self.address = address
+        self.authkey = authkey
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self._thread = threading.Thread(target=self._accept_loop, name='engine-rpc')
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info(f"Engine RPC listening on {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_loop(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                break  # listener closed
+            except Exception as e:
+                logger.warning(f"Rejected engine RPC connection: {str(e)}")
+                continue
+            handler = threading.Thread(target=self._handle, args=(conn,))
+            handler.daemon = True
+            handler.start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                command, kwargs = conn.recv()
+            except EOFError:
+                return
+            handler = self.handlers.get(command)
+            if handler is None:
+                conn.send(('error', f"Unknown command: {command}"))
+                return
+            try:
+                conn.send(('ok', handler(**kwargs)))
+            except Exception as e:
+                logger.error(f"Engine command {command} failed: {str(e)}")
+                conn.send(('error', str(e)))
+
+
+class RpcClient:
+    """Sends one command per connection, so a slow command never blocks another caller"""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes, timeout: float):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+
+    def call(self, command: str, timeout: float = None, **kwargs):
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except OSError as e:
+            raise ConnectionError(f"Trading engine unreachable: {str(e)}")
+        with conn:
+            conn.send((command, kwargs))
+            if not conn.poll(timeout or self.timeout):
+                raise TimeoutError(f"Trading engine did not answer {command}")
+            status, result = conn.recv()
+        if status != 'ok':
+            raise Exception(result)
+        return result
@@ -0,0 +1,291 @@
+import logging
+import os
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+
+MAGIC = b'BBJ1'
+
+# Event types
+SIGNAL = 1
+ORDER = 2
+FILL = 3
+EXIT_TP = 4
+EXIT_SL = 5
+EXIT_OTHER = 6
+SCALE_IN = 7
+
+EVENT_NAMES = {
+    SIGNAL: 'signal',
+    ORDER: 'order',
+    FILL: 'fill',
+    EXIT_TP: 'tp',
+    EXIT_SL: 'sl',
+    EXIT_OTHER: 'exit',
+    SCALE_IN: 'scale_in',
+}
+EXIT_EVENTS = (EXIT_TP, EXIT_SL, EXIT_OTHER)
+
+# Fixed-width little-endian record; the file body is a raw array of these
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),          # event time, ms
+    ('event', 'u1'),
+    ('side', 'i1'),         # +1 long / -1 short
+    ('symbol', 'S24'),
+    ('price', '<f8'),
+    ('quantity', '<f8'),
+    ('pnl', '<f8'),
+    ('fee', '<f8'),
+    ('tp', '<f8'),
+    ('sl', '<f8'),
+    ('latency', '<f4'),     # ms since the candle close that triggered the event, NaN if unknown
+])
+
+
+class TradeJournal:
+    """Append-only binary journal of trading events with in-memory indexes
+
+    Records are appended to an in-memory column store on the caller's thread
+    (a single row assignment) and written to disk by a background thread that
+    fsyncs in batches, so the trading loop never waits on I/O. The store holds
+    at most `max_records`; beyond that the oldest quarter of flushed records is
+    evicted from memory (the file keeps everything).
+    """
+
+    def __init__(self, path: str = None, flush_interval: float = None, max_records: int = None):
+        self.path = path or Config.JOURNAL_PATH
+        self.flush_interval = flush_interval or Config.JOURNAL_FLUSH_INTERVAL
+        self.max_records = max_records or Config.JOURNAL_MAX_RECORDS
+        self.evicted = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one flush at a time, so file order matches record order
+        self._data = np.zeros(1024, dtype=RECORD_DTYPE)
+        self._size = 0
+        self._flushed = 0
+        self._by_symbol: Dict[str, array] = {}
+        self._last_ts = 0
+        self._load()
+
+        self._file = open(self.path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name='journal-writer')
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _load(self):
+        """Load existing records, dropping a torn trailing record from an interrupted write"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a trade journal")
+        body = os.path.getsize(self.path) - len(MAGIC)
+        complete = body - body % RECORD_DTYPE.itemsize
+        if complete != body:
+            self.logger.warning(f"Truncating {body - complete} bytes of partial record in {self.path}")
+            os.truncate(self.path, len(MAGIC) + complete)
+
+        records = np.fromfile(self.path, dtype=RECORD_DTYPE, offset=len(MAGIC))
+        if len(records):
+            self._last_ts = int(records['ts'][-1])
+        if len(records) > self.max_records:
+            self.evicted = len(records) - self.max_records
+            records = records[-self.max_records:]
+        self._reserve(len(records))
+        self._data[:len(records)] = records
+        self._size = self._flushed = len(records)
+        self._rebuild_index()
+        self.logger.info(f"Loaded {len(records)} journal records from {self.path}")
+
+    def _rebuild_index(self):
+        """Group row numbers by symbol without a Python loop over rows"""
+        symbols, inverse = np.unique(self._data['symbol'][:self._size], return_inverse=True)
+        order = np.argsort(inverse, kind='stable').astype(np.int64)
+        bounds = np.searchsorted(inverse[order], np.arange(len(symbols) + 1))
+        self._by_symbol = {}
+        for i, symbol in enumerate(symbols):
+            rows = array('q')
+            rows.frombytes(order[bounds[i]:bounds[i + 1]].tobytes())
+            self._by_symbol[symbol.decode()] = rows
+
+    def _reserve(self, size: int):
+        if size > len(self._data):
+            grown = np.zeros(max(size, min(len(self._data) * 2, self.max_records)), dtype=RECORD_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def _evict(self):
+        """Drop the oldest quarter of the store; only records already on disk are dropped"""
+        count = min(self._flushed, self.max_records // 4)
+        if not count:
+            return
+        self._data[:self._size - count] = self._data[count:self._size]
+        self._size -= count
+        self._flushed -= count
+        self.evicted += count
+        self._rebuild_index()
+        self.logger.info(f"Evicted {count} oldest journal records from memory")
+
+    def record(self, event: int, symbol: str, ts: int, side: int = 0, price: float = 0.0,
+               quantity: float = 0.0, pnl: float = 0.0, fee: float = 0.0, tp: float = 0.0,
+               sl: float = 0.0, latency: float = float('nan')):
+        """Append an event; cheap enough to call inline from the trading loop"""
+        with self._lock:
+            # Keep ts non-decreasing so time ranges can be found by binary search
+            ts = self._last_ts = max(ts, self._last_ts)
+            if self._size >= self.max_records:
+                self._evict()
+            self._reserve(self._size + 1)
+            row = self._size
+            self._data[row] = (ts, event, side, symbol.encode()[:24], price, quantity, pnl, fee,
+                               tp or 0.0, sl or 0.0, latency)
+            self._size += 1
+            rows = self._by_symbol.get(symbol)
+            if rows is None:
+                rows = self._by_symbol[symbol] = array('q')
+            rows.append(row)
+
+    def flush(self):
+        """Write pending records and fsync; records count as flushed only once they are on disk"""
+        with self._write_lock:
+            if self._file.closed:
+                return
+            with self._lock:
+                count = self._size - self._flushed
+                pending = self._data[self._flushed:self._size].tobytes()
+            if not count:
+                return
+            position = self._file.tell()
+            try:
+                self._file.write(pending)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception:
+                # Drop any partial write so the next flush rewrites these records whole
+                self._file.seek(position)
+                self._file.truncate()
+                raise
+            with self._lock:
+                self._flushed += count  # relative: eviction may have shifted rows meanwhile
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Journal flush failed: {str(e)}")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5.0)
+        self.flush()
+        with self._write_lock:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _select(self, symbol: str = None, since: int = None, until: int = None,
+                events=None) -> np.ndarray:
+        """Rows matching the filters, using the symbol index and the time-ordered ts column"""
+        with self._lock:
+            view = self._data[:self._size]
+            if since is not None or until is not None:
+                ts = view['ts']
+                lo = np.searchsorted(ts, since) if since is not None else 0
+                hi = np.searchsorted(ts, until, side='right') if until is not None else len(view)
+            else:
+                lo, hi = 0, len(view)
+            if symbol is not None:
+                rows = np.frombuffer(self._by_symbol.get(symbol, array('q')), dtype=np.int64)
+                rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+                view = view[rows]  # fancy indexing copies
+            else:
+                view = view[lo:hi].copy()
+        if events is not None:
+            view = view[np.isin(view['event'], events)]
+        return view
+
+    def summary(self, since: int = None, until: int = None) -> Dict:
+        """Closed-trade PnL, win rate and fees for the period"""
+        exits = self._select(since=since, until=until, events=EXIT_EVENTS)
+        pnl = exits['pnl']
+        return {
+            'trades': len(exits),
+            'pnl': float(pnl.sum()),
+            'wins': int((pnl > 0).sum()),
+            'win_rate': float((pnl > 0).mean()) if len(pnl) else 0.0,
+            'fees': float(exits['fee'].sum()),
+            'tp_exits': int((exits['event'] == EXIT_TP).sum()),
+            'sl_exits': int((exits['event'] == EXIT_SL).sum()),
+        }
+
+    def pnl_by_symbol(self, since: int = None, until: int = None) -> List[Dict]:
+        """Per-symbol closed-trade PnL and win rate, best first"""
+        exits = self._select(since=since, until=until, events=EXIT_EVENTS)
+        if not len(exits):
+            return []
+        symbols, inverse = np.unique(exits['symbol'], return_inverse=True)
+        pnl = np.bincount(inverse, weights=exits['pnl'])
+        trades = np.bincount(inverse)
+        wins = np.bincount(inverse, weights=exits['pnl'] > 0)
+        result = [
+            {'symbol': symbol.decode(), 'pnl': float(pnl[i]), 'trades': int(trades[i]),
+             'win_rate': float(wins[i] / trades[i])}
+            for i, symbol in enumerate(symbols)
+        ]
+        result.sort(key=lambda x: x['pnl'], reverse=True)
+        return result
+
+    def latency_percentiles(self, event: int = ORDER, since: int = None) -> Optional[Dict]:
+        """Close-to-event latency percentiles in ms"""
+        latency = self._select(since=since, events=(event,))['latency']
+        latency = latency[~np.isnan(latency)]
+        if not len(latency):
+            return None
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+        return {'count': len(latency), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                'max': float(latency.max())}
+
+    def recent(self, limit: int = 50, symbol: str = None) -> List[Dict]:
+        """Most recent events, newest first"""
+        rows = self._select(symbol=symbol)[-limit:][::-1]
+        return [
+            {'ts': int(r['ts']), 'event': EVENT_NAMES.get(int(r['event']), '?'),
+             'symbol': r['symbol'].decode(), 'side': 'long' if r['side'] > 0 else 'short',
+             'price': float(r['price']), 'quantity': float(r['quantity']), 'pnl': float(r['pnl'])}
+            for r in rows
+        ]
+
+
+_journal: Optional[TradeJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> TradeJournal:
+    """Process-wide journal shared by the trading loop and the dashboard"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = TradeJournal()
+        return _journal
+
+
+def close_journal():
+    """Flush and close the process-wide journal; the next get_journal() reopens Config.JOURNAL_PATH"""
+    global _journal
+    with _journal_lock:
+        if _journal is not None:
+            _journal.close()
+            _journal = None
@@ -0,0 +1,107 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _cancel_all(exchange, tpsl: bool) -> Tuple[int, int]:
+    """Cancel every pending order of one kind; returns (found, cancelled)"""
+    orders = exchange.fetch_pending_orders(tpsl=tpsl)
+    if not orders:
+        return 0, 0
+    return len(orders), exchange.cancel_orders_batch(orders, tpsl=tpsl)
+
+
+def _close(exchange, position: Dict, entry: Dict, started: float):
+    try:
+        exchange.close_position(position['symbol'], position.get('marginMode'))
+        entry['acked_after'] = time.monotonic() - started
+        entry['error'] = None
+    except Exception as e:
+        entry['last_attempt'] = None  # resend on the next round instead of waiting for confirmation
+        entry['error'] = str(e)[:200]
+        logger.error(f"Close of {position['symbol']} failed: {str(e)}")
+
+
+def flatten_all(exchange, timeout: float = None) -> Dict:
+    """Cancel all active and TP/SL orders and close every position concurrently until the account is flat
+
+    Each round lists and batch-cancels pending orders while re-reading positions, then
+    closes every open position in parallel (trading requests go through the shared rate
+    limiter). Positions whose close has not shown up within FLATTEN_CONFIRM_TIMEOUT, or
+    whose close failed, are sent again. Time-to-flat is measured from the start of the call
+    to the first poll where the position is gone.
+    """
+    timeout = timeout or Config.FLATTEN_TIMEOUT
+    started = time.monotonic()
+    positions: Dict[str, Dict] = {}
+    report = {'flat': False, 'rounds': 0, 'cancelled_orders': 0, 'cancelled_tpsl': 0, 'errors': []}
+
+    with ThreadPoolExecutor(max_workers=Config.FLATTEN_WORKERS, thread_name_prefix='flatten') as pool:
+        while True:
+            report['rounds'] += 1
+            cancels = {tpsl: pool.submit(_cancel_all, exchange, tpsl) for tpsl in (False, True)}
+
+            open_positions: Optional[list] = None
+            try:
+                open_positions = exchange.get_positions()
+            except Exception as e:
+                report['errors'].append(str(e)[:200])
+                logger.error(f"Flatten could not read positions: {str(e)}")
+
+            closes = []
+            if open_positions is not None:
+                now = time.monotonic()
+                open_symbols = {pos['symbol'] for pos in open_positions}
+                for symbol, entry in positions.items():
+                    if entry['time_to_flat'] is None and symbol not in open_symbols:
+                        entry['time_to_flat'] = now - started
+                        logger.info(f"{symbol} flat after {entry['time_to_flat'] * 1000:.0f} ms")
+
+                for pos in open_positions:
+                    entry = positions.setdefault(pos['symbol'], {
+                        'symbol': pos['symbol'],
+                        'side': pos.get('side'),
+                        'contracts': float(pos['contracts']),
+                        'attempts': 0,
+                        'acked_after': None,
+                        'time_to_flat': None,
+                        'last_attempt': None,
+                        'error': None,
+                    })
+                    entry['time_to_flat'] = None  # (re)opened since the last poll
+                    if entry['last_attempt'] is None or now - entry['last_attempt'] > Config.FLATTEN_CONFIRM_TIMEOUT:
+                        entry['attempts'] += 1
+                        entry['last_attempt'] = now
+                        closes.append(pool.submit(_close, exchange, pos, entry, started))
+
+            pending = 0
+            for tpsl, future in cancels.items():
+                try:
+                    found, cancelled = future.result()
+                    pending += found
+                    report['cancelled_tpsl' if tpsl else 'cancelled_orders'] += cancelled
+                except Exception as e:
+                    pending += 1  # unknown, so not confirmed empty
+                    report['errors'].append(str(e)[:200])
+                    logger.error(f"Flatten could not cancel {'TP/SL' if tpsl else 'active'} orders: {str(e)}")
+            for future in closes:
+                future.result()
+
+            if open_positions == [] and pending == 0:
+                report['flat'] = True
+                break
+            if time.monotonic() - started > timeout:
+                logger.error(f"Flatten gave up after {timeout}s with positions or orders still open")
+                break
+            time.sleep(Config.FLATTEN_POLL_INTERVAL)
+
+    report['elapsed'] = time.monotonic() - started
+    report['positions'] = sorted(
+        ({key: value for key, value in entry.items() if key != 'last_attempt'} for entry in positions.values()),
+        key=lambda entry: entry['time_to_flat'] if entry['time_to_flat'] is not None else float('inf'))
+    return report
@@ -1,15 +1,35 @@
+import os
 import time
 import logging
+import secrets
 import threading
+import multiprocessing
 from config import Config
 from utils import setup_logging, validate_timeframe
 from server import start_server
+from engine import TradingEngine
+from memory import memory_monitor
 from trading_bot import run_trading_bot
 
+def run_web_process():
+    """Entry point of the web process in split deployment"""
+    setup_logging()
+    if Config.WEB_NICE:
+        os.nice(Config.WEB_NICE)
+    start_server(remote=True)
+
+def start_web_process() -> multiprocessing.Process:
+    process = multiprocessing.get_context('spawn').Process(target=run_web_process, name='web')
+    process.daemon = True
+    process.start()
+    return process
+
 def main():
     # Setup logging
     setup_logging()
     logger = logging.getLogger(__name__)
+    engine = None
+    web_process = None
 
     try:
         # Validate configuration
@@ -17,11 +37,24 @@ def main():
         if not validate_timeframe(Config.TIMEFRAME):
             raise ValueError(f"Invalid timeframe: {Config.TIMEFRAME}")
 
-        # Start web server in a separate thread with proper error handling
-        web_thread = threading.Thread(target=start_server)
-        web_thread.daemon = True
-        web_thread.start()
-        logger.info("Web server thread started")
+        # Sample RSS and object counts for the /memory endpoints
+        memory_monitor.start()
+
+        if Config.DEPLOY_MODE == 'split':
+            # Trading engine stays in this process; the dashboard gets its own interpreter and GIL
+            if not Config.ENGINE_RPC_AUTHKEY:
+                Config.ENGINE_RPC_AUTHKEY = secrets.token_hex(16)
+                os.environ['ENGINE_RPC_AUTHKEY'] = Config.ENGINE_RPC_AUTHKEY  # inherited by the web process
+            engine = TradingEngine()
+            engine.start()
+            web_process = start_web_process()
+            logger.info(f"Web server process started (pid {web_process.pid})")
+        else:
+            # Start web server in a separate thread with proper error handling
+            web_thread = threading.Thread(target=start_server)
+            web_thread.daemon = True
+            web_thread.start()
+            logger.info("Web server thread started")
 
         # Wait for web server to be ready
         server_wait_time = 0
@@ -42,12 +75,22 @@ def main():
             logger.error("Web server failed to start within the timeout period")
             raise Exception("Web server startup timeout")
 
-        # Keep the main thread running
+        # Keep the main thread running; in split mode it publishes the dashboard state
         while True:
-            time.sleep(1)
+            if engine is None:
+                time.sleep(1)
+                continue
+            engine.publish()
+            if not web_process.is_alive():
+                logger.error(f"Web server process exited with code {web_process.exitcode}, restarting")
+                web_process = start_web_process()
+            time.sleep(Config.STATE_PUBLISH_INTERVAL)
 
     except Exception as e:
         logger.error(f"Fatal error in main: {str(e)}")
+    finally:
+        if engine is not None:
+            engine.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
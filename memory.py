@@ -0,0 +1,158 @@
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def object_counts(limit: int = None) -> Dict[str, int]:
+    """Live gc-tracked objects by type name, most common first"""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return dict(counts.most_common(limit))
+
+
+class MemoryMonitor:
+    """RSS / object-count gauges over time plus tracemalloc snapshots and diffs"""
+
+    def __init__(self, history: int = None):
+        self.history = deque(maxlen=history or Config.MEMORY_HISTORY)
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_types: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Dict:
+        """Record one gauge sample"""
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        sample = {
+            'ts': int(time.time() * 1000),
+            'rss': rss_bytes(),
+            'objects': len(gc.get_objects()),
+            'threads': threading.active_count(),
+            'traced': traced,
+            'traced_peak': peak,
+        }
+        self.history.append(sample)
+        return sample
+
+    def start(self, interval: float = None):
+        """Sample in a background thread; also starts tracemalloc when MEMORY_TRACE is set"""
+        if self._thread is not None:
+            return
+        if Config.MEMORY_TRACE:
+            self.start_tracing()
+        interval = interval or Config.MEMORY_SAMPLE_INTERVAL
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.sample()
+                except Exception as e:
+                    logger.error(f"Memory sample failed: {str(e)}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='memory-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(Config.MEMORY_TRACE_FRAMES)
+            logger.info(f"tracemalloc started ({Config.MEMORY_TRACE_FRAMES} frames)")
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+
+    @staticmethod
+    def _format_stats(stats, limit: int) -> List[Dict]:
+        return [
+            {
+                'location': str(stat.traceback[0]) if stat.traceback else '?',
+                'size': stat.size,
+                'size_diff': getattr(stat, 'size_diff', None),
+                'count': stat.count,
+                'count_diff': getattr(stat, 'count_diff', None),
+            }
+            for stat in stats[:limit]
+        ]
+
+    def snapshot(self, limit: int = 25) -> Dict:
+        """Top allocators by line; the snapshot becomes the baseline for `diff`"""
+        self.start_tracing()
+        snapshot = self._take_snapshot()
+        types = object_counts()
+        with self._lock:
+            self._baseline, self._baseline_types = snapshot, types
+        return {
+            'sample': self.sample(),
+            'top_allocators': self._format_stats(snapshot.statistics('lineno'), limit),
+            'top_types': dict(list(types.items())[:limit]),
+        }
+
+    def diff(self, limit: int = 25) -> Dict:
+        """Allocation and object-count growth since the last `snapshot`"""
+        with self._lock:
+            baseline, baseline_types = self._baseline, self._baseline_types
+        if baseline is None:
+            raise ValueError("No baseline snapshot, take one first")
+        current = self._take_snapshot()
+        types = object_counts()
+        grown = sorted(((name, count - baseline_types.get(name, 0)) for name, count in types.items()),
+                       key=lambda item: item[1], reverse=True)
+        return {
+            'sample': self.sample(),
+            'top_allocators': self._format_stats(current.compare_to(baseline, 'lineno'), limit),
+            'type_growth': {name: delta for name, delta in grown[:limit] if delta > 0},
+        }
+
+    def status(self) -> Dict:
+        """Latest gauges, growth over the retained window and whether tracing is on"""
+        samples = list(self.history)
+        if not samples:
+            samples = [self.sample()]
+        first, last = samples[0], samples[-1]
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'current': last,
+            'rss_growth': last['rss'] - first['rss'],
+            'object_growth': last['objects'] - first['objects'],
+            'window_seconds': (last['ts'] - first['ts']) / 1000,
+            'history': samples,
+        }
+
+
+# Global instance
+memory_monitor = MemoryMonitor()
@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from config import Config
+
+
+class BookSide:
+    """One side of an L2 book kept as sorted parallel price/size arrays"""
+    __slots__ = ('descending', 'keys', 'sizes')
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        # Bids are stored with negated prices so both sides sort ascending
+        # from the best level and can share the same bisect logic
+        self.keys = array('d')
+        self.sizes = array('d')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.descending else price
+
+    def load(self, levels: Iterable) -> None:
+        """Replace the side with a full snapshot"""
+        merged = {}
+        for level in levels:
+            size = float(level[1])
+            if size > 0:
+                merged[self._key(float(level[0]))] = size
+        ordered = sorted(merged)
+        self.keys = array('d', ordered)
+        self.sizes = array('d', (merged[key] for key in ordered))
+
+    def apply(self, levels: Iterable) -> None:
+        """Merge incremental levels: zero size deletes, otherwise replace or insert"""
+        keys, sizes = self.keys, self.sizes
+        for level in levels:
+            key = self._key(float(level[0]))
+            size = float(level[1])
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                if size == 0:
+                    del keys[i]
+                    del sizes[i]
+                else:
+                    sizes[i] = size
+            elif size > 0:
+                keys.insert(i, key)
+                sizes.insert(i, size)
+
+    def best(self) -> Optional[float]:
+        if not self.keys:
+            return None
+        return -self.keys[0] if self.descending else self.keys[0]
+
+    def price_at(self, i: int) -> float:
+        return -self.keys[i] if self.descending else self.keys[i]
+
+
+class LocalOrderBook:
+    """Order book for a single instrument fed by snapshots and sequenced updates"""
+
+    def __init__(self, symbol: str, inst_id: str, contract_size: float = 1.0):
+        self.symbol = symbol
+        self.inst_id = inst_id
+        self.contract_size = contract_size
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.seq_id: Optional[int] = None  # None until a sequenced WS snapshot arrives
+        self.resync_pending = False  # a new snapshot was requested after a gap; updates are dropped until it arrives
+        self.ts = 0
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+
+    def apply_snapshot(self, data: Dict, seq_id: Optional[int] = None) -> None:
+        """Load a full snapshot (WS `snapshot` push or REST fallback)"""
+        with self.lock:
+            self.bids.load(data.get('bids') or [])
+            self.asks.load(data.get('asks') or [])
+            self.seq_id = seq_id
+            if seq_id is not None:
+                self.resync_pending = False
+            self.ts = int(data.get('ts') or data.get('timestamp') or 0)
+            self.updated_at = time.monotonic()
+
+    def apply_update(self, data: Dict) -> bool:
+        """Merge an incremental update; returns False when a sequence gap is detected"""
+        with self.lock:
+            if self.seq_id is None:
+                return False
+            if int(data['prevSeqId']) != self.seq_id:
+                self.seq_id = None
+                return False
+            self.bids.apply(data.get('bids') or [])
+            self.asks.apply(data.get('asks') or [])
+            self.seq_id = int(data['seqId'])
+            self.ts = int(data.get('ts') or 0)
+            self.updated_at = time.monotonic()
+            return True
+
+    def mid_price(self) -> Optional[float]:
+        with self.lock:
+            bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def estimate_fill(self, side: str, amount: float) -> Tuple[Optional[float], float]:
+        """Walk the book for a market order of `amount` base units; returns (vwap, filled amount)"""
+        book_side = self.asks if side == 'buy' else self.bids
+        remaining = amount
+        cost = 0.0
+        with self.lock:
+            for i in range(len(book_side)):
+                if remaining <= 0:
+                    break
+                available = book_side.sizes[i] * self.contract_size
+                take = available if available < remaining else remaining
+                cost += take * book_side.price_at(i)
+                remaining -= take
+        filled = amount - remaining
+        if filled <= 0:
+            return None, 0.0
+        return cost / filled, filled
+
+    def expected_vwap(self, side: str, amount: float) -> Optional[float]:
+        """Expected average fill price for `amount`, or None if the book is too thin"""
+        vwap, filled = self.estimate_fill(side, amount)
+        if vwap is None or filled < amount:
+            return None
+        return vwap
+
+    def max_amount_for_vwap(self, side: str, vwap_limit: float) -> float:
+        """Largest amount whose expected VWAP stays at or better than `vwap_limit`"""
+        book_side = self.asks if side == 'buy' else self.bids
+        filled = 0.0
+        cost = 0.0
+        with self.lock:
+            for i in range(len(book_side)):
+                price = book_side.price_at(i)
+                available = book_side.sizes[i] * self.contract_size
+                # Taking x at `price` keeps (cost + price * x) / (filled + x) within the limit while
+                # x * (price - limit) <= limit * filled - cost (signs flipped for sells)
+                if side == 'buy':
+                    if price <= vwap_limit:
+                        filled, cost = filled + available, cost + available * price
+                        continue
+                    take = (vwap_limit * filled - cost) / (price - vwap_limit)
+                else:
+                    if price >= vwap_limit:
+                        filled, cost = filled + available, cost + available * price
+                        continue
+                    take = (cost - vwap_limit * filled) / (vwap_limit - price)
+                filled += max(0.0, min(take, available))
+                break
+        return filled
+
+
+class OrderBookManager:
+    """Keeps local books for tracked symbols in sync with the WS `books` channel"""
+
+    def __init__(self, exchange, url: str = None):
+        self.exchange = exchange
+        self.url = url or Config.WS_PUBLIC_URL
+        self.logger = logging.getLogger(__name__)
+        self.books: Dict[str, LocalOrderBook] = {}  # keyed by instId
+        self._tracked: Dict[str, str] = {}  # instId -> ccxt symbol
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._running = False
+        self.connected = False
+        self.gaps_detected = 0
+
+    def start(self):
+        """Start the WS feed in a background thread"""
+        if self._running:
+            return
+        self._running = True
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),))
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info(f"Order book feed started ({self.url})")
+
+    def stop(self):
+        """Stop the WS feed"""
+        self._running = False
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        self.connected = False
+        self.logger.info("Order book feed stopped")
+
+    def _market(self, symbol: str) -> Dict:
+        self.exchange.exchange.load_markets()
+        return self.exchange.exchange.market(symbol)
+
+    def track(self, symbols: List[str]):
+        """Subscribe to the given symbols and drop books for symbols no longer needed"""
+        wanted = {}
+        for symbol in set(symbols):
+            try:
+                market = self._market(symbol)
+                wanted[market['id']] = symbol
+                with self._lock:
+                    if market['id'] not in self.books:
+                        self.books[market['id']] = LocalOrderBook(
+                            symbol, market['id'], float(market.get('contractSize') or 1.0))
+            except Exception as e:
+                self.logger.error(f"Cannot track order book for {symbol}: {str(e)}")
+
+        with self._lock:
+            added = [inst_id for inst_id in wanted if inst_id not in self._tracked]
+            removed = [inst_id for inst_id in self._tracked if inst_id not in wanted]
+            self._tracked = wanted
+            for inst_id in removed:
+                self.books.pop(inst_id, None)
+
+        if removed:
+            self._send('unsubscribe', removed)
+        if added:
+            self._send('subscribe', added)
+
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        """Return a usable book for symbol, loading a REST snapshot if the WS copy is not synced"""
+        try:
+            market = self._market(symbol)
+        except Exception as e:
+            self.logger.error(f"Unknown symbol {symbol}: {str(e)}")
+            return None
+
+        with self._lock:
+            book = self.books.get(market['id'])
+            if book is None:
+                book = LocalOrderBook(symbol, market['id'], float(market.get('contractSize') or 1.0))
+                self.books[market['id']] = book
+                self._evict_untracked()
+
+        if book.seq_id is not None and self.connected:
+            return book
+        if time.monotonic() - book.updated_at <= Config.ORDER_BOOK_MAX_AGE:
+            return book
+
+        try:
+            snapshot = self.exchange._handle_request(self.exchange.exchange.fetch_order_book, symbol, 100)
+            book.apply_snapshot(snapshot)
+            return book
+        except Exception as e:
+            self.logger.error(f"Failed to load order book snapshot for {symbol}: {str(e)}")
+            return None
+
+    def _evict_untracked(self):
+        """Keep at most ORDER_BOOK_MAX_BOOKS books by dropping the stalest untracked ones; caller holds the lock"""
+        excess = len(self.books) - Config.ORDER_BOOK_MAX_BOOKS
+        if excess <= 0:
+            return
+        untracked = sorted((book.updated_at, inst_id) for inst_id, book in self.books.items()
+                           if inst_id not in self._tracked)
+        for _, inst_id in untracked[:excess]:
+            del self.books[inst_id]
+
+    def _send(self, op: str, inst_ids: List[str]):
+        if not inst_ids or self._loop is None or self._ws is None:
+            return
+        message = {'op': op, 'args': [{'channel': 'books', 'instId': inst_id} for inst_id in inst_ids]}
+        asyncio.run_coroutine_threadsafe(self._ws.send_str(json.dumps(message)), self._loop)
+
+    def _resync(self, inst_id: str):
+        """Resubscribe to get a fresh snapshot after a sequence gap"""
+        self.gaps_detected += 1
+        self.logger.warning(f"Sequence gap in {inst_id} order book, requesting new snapshot")
+        asyncio.ensure_future(self._ws.send_str(json.dumps({
+            'op': 'unsubscribe', 'args': [{'channel': 'books', 'instId': inst_id}]})))
+        asyncio.ensure_future(self._ws.send_str(json.dumps({
+            'op': 'subscribe', 'args': [{'channel': 'books', 'instId': inst_id}]})))
+
+    def _handle_message(self, raw: str):
+        if raw == 'pong':
+            return
+        message = json.loads(raw)
+        if 'event' in message:
+            if message['event'] == 'error':
+                self.logger.error(f"Order book WS error: {message.get('msg')}")
+            return
+
+        inst_id = message.get('arg', {}).get('instId')
+        data = message.get('data')
+        book = self.books.get(inst_id)
+        if book is None or not data:
+            return
+
+        if message.get('action') == 'snapshot':
+            book.apply_snapshot(data, seq_id=int(data['seqId']))
+        elif book.resync_pending:
+            return  # still in flight from before the gap; the requested snapshot replaces them
+        elif not book.apply_update(data):
+            book.resync_pending = True
+            self._resync(inst_id)
+
+    async def _run(self):
+        """Connect, subscribe and pump messages until stopped, reconnecting on failure"""
+        while self._running:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.url) as ws:
+                        self._ws = ws
+                        self.connected = True
+                        with self._lock:
+                            tracked = list(self._tracked)
+                        if tracked:
+                            await ws.send_str(json.dumps({
+                                'op': 'subscribe',
+                                'args': [{'channel': 'books', 'instId': inst_id} for inst_id in tracked]}))
+
+                        while self._running:
+                            try:
+                                msg = await ws.receive(timeout=25)
+                            except asyncio.TimeoutError:
+                                await ws.send_str('ping')  # keep-alive, server drops idle links after 30s
+                                continue
+                            if msg.type != aiohttp.WSMsgType.TEXT:
+                                break
+                            self._handle_message(msg.data)
+            except Exception as e:
+                self.logger.error(f"Order book WS connection error: {str(e)}")
+            finally:
+                self._ws = None
+                self.connected = False
+                for book in list(self.books.values()):
+                    book.seq_id = None
+
+            if self._running:
+                await asyncio.sleep(1)  # new connections are limited to 1 per second
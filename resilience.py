@@ -0,0 +1,269 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional
+
+import ccxt
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors that say something about the request, not the health of the endpoint
+NON_RETRYABLE_ERRORS = (
+    ccxt.AuthenticationError,
+    ccxt.PermissionDenied,
+    ccxt.InsufficientFunds,
+    ccxt.InvalidOrder,
+    ccxt.BadRequest,
+    ccxt.BadSymbol,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint is short-circuited or the API is in a ban window"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may go out; lets a single trial through once the reset timeout passes"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.open_until:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Exception, open_for: float = None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            self._trial_in_flight = False
+            if open_for or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.open_until = self.opened_at + (open_for or self.reset_timeout)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'endpoint': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': max(0.0, self.open_until - time.monotonic()) if self.state == self.OPEN else 0.0,
+                'last_error': self.last_error,
+            }
+
+
+class LatencyTracker:
+    """Rolling latency window used to pick the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RateLimiter:
+    """Sliding-window limiter that blocks callers until a request slot is free"""
+
+    def __init__(self, max_requests: int, window: float):
+        self.max_requests = max_requests
+        self.window = window
+        self.sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self.sent and now - self.sent[0] >= self.window:
+                    self.sent.popleft()
+                if len(self.sent) < self.max_requests:
+                    self.sent.append(now)
+                    return
+                delay = self.window - (now - self.sent[0])
+            time.sleep(delay)
+
+
+class ResilienceManager:
+    """Per-endpoint retry, circuit breaking and hedging for exchange calls"""
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.banned_until = 0.0
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(
+                    name, Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT)
+                self.latencies[name] = LatencyTracker()
+            return self.breakers[name]
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        ceiling = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _ban_window(self, error: Exception) -> float:
+        """Seconds to stay away after a rate-limit (429) or firewall (403) response, 0 otherwise"""
+        # ccxt maps bare HTTP 429/403 responses to ExchangeNotAvailable
+        tokens = str(error).split() if isinstance(error, ccxt.ExchangeNotAvailable) else []
+        if isinstance(error, ccxt.DDoSProtection) or '403' in tokens:
+            return Config.FIREWALL_BAN_SECONDS
+        if isinstance(error, ccxt.RateLimitExceeded) or '429' in tokens:
+            return Config.RATE_LIMIT_BACKOFF
+        return 0.0
+
+    def call(self, name: str, operation, *args, idempotent: bool = True, limiter: 'RateLimiter' = None, **kwargs):
+        """Run operation with backoff and circuit breaking; idempotent reads may be hedged
+
+        A limiter is charged once per attempt, since every retry is another request.
+        """
+        breaker = self._breaker(name)
+        deadline = time.monotonic() + Config.RETRY_BUDGET
+
+        for attempt in range(Config.RETRY_MAX_ATTEMPTS):
+            now = time.monotonic()
+            if now < self.banned_until:
+                raise CircuitOpenError(f"API rate limited, retry in {self.banned_until - now:.0f}s")
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {name}: {breaker.last_error}")
+
+            if limiter is not None:
+                limiter.acquire()
+            started = time.monotonic()
+            try:
+                if idempotent:
+                    result = self._hedged(name, operation, *args, **kwargs)
+                else:
+                    result = operation(*args, **kwargs)
+                self.latencies[name].record(time.monotonic() - started)
+                breaker.record_success()
+                return result
+            except NON_RETRYABLE_ERRORS:
+                breaker.record_success()  # the endpoint answered
+                raise
+            except (ccxt.NetworkError, ccxt.ExchangeError) as e:
+                ban = self._ban_window(e)
+                if ban:
+                    self.banned_until = max(self.banned_until, time.monotonic() + ban)
+                    breaker.record_failure(e, open_for=ban)
+                    logger.warning(f"{name} rate limited, backing off for {ban:.0f}s")
+                    if attempt == Config.RETRY_MAX_ATTEMPTS - 1 or time.monotonic() + ban > deadline:
+                        raise
+                    time.sleep(ban)
+                    continue
+                breaker.record_failure(e)
+                if not idempotent and not isinstance(e, ccxt.NetworkError):
+                    raise
+                delay = self.backoff(attempt)
+                if attempt == Config.RETRY_MAX_ATTEMPTS - 1 or time.monotonic() + delay > deadline:
+                    raise
+                logger.warning(f"{name} failed ({str(e)[:120]}), retrying in {delay:.2f}s "
+                               f"({attempt + 1}/{Config.RETRY_MAX_ATTEMPTS})")
+                time.sleep(delay)
+            except Exception as e:
+                # A parser or caller bug still ends a half-open trial; otherwise the breaker never closes again
+                breaker.record_failure(e)
+                raise
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        """Hedge after the endpoint's p95 latency, once there is enough history and hedge budget"""
+        tracker = self.latencies[name]
+        if len(tracker.samples) < 20 or self.hedges > self.calls * Config.HEDGE_BUDGET + 1:
+            return None
+        return max(Config.HEDGE_MIN_DELAY, tracker.percentile(0.95))
+
+    def _hedged(self, name: str, operation, *args, **kwargs):
+        self.calls += 1
+        delay = self._hedge_delay(name)
+        if delay is None:
+            return operation(*args, **kwargs)
+
+        primary = self._executor.submit(operation, *args, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = self._executor.submit(operation, *args, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def status(self) -> Dict:
+        """Snapshot for the dashboard"""
+        with self._lock:
+            breakers: List[CircuitBreaker] = list(self.breakers.values())
+        return {
+            'banned_for': max(0.0, self.banned_until - time.monotonic()),
+            'calls': self.calls,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'endpoints': [
+                {**breaker.status(), 'p95_ms': (self.latencies[breaker.name].percentile(0.95) or 0.0) * 1000}
+                for breaker in breakers
+            ],
+        }
+
+
+# Global instances shared by every BlofingExchange in the process
+resilience = ResilienceManager()
+trade_limiter = RateLimiter(Config.TRADE_RATE_LIMIT, Config.TRADE_RATE_WINDOW)
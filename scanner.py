@@ -1,17 +1,44 @@
-import pandas as pd
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from strategy import TradingStrategy
+from candles import last_value
+from correlation import RollingCorrelation, select_decorrelated
+from funding import FundingCache
+from clock import system_clock
+
+
+class LatestScan:
+    """Coins and signals from the trading loop's most recent scan, for the dashboard"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.coins: List[Dict] = []
+        self.updated_at: Optional[float] = None
+
+    def update(self, coins: List[Dict]):
+        with self._lock:
+            self.coins = coins
+            self.updated_at = time.time()
+
+    def snapshot(self) -> Tuple[List[Dict], Optional[float]]:
+        with self._lock:
+            return list(self.coins), self.updated_at
+
 
 class CoinScanner:
-    def __init__(self, exchange, config):
+    def __init__(self, exchange, config, clock=None):
         self.exchange = exchange
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.strategy = TradingStrategy(config.SMA_PERIOD, config.EMA_PERIOD)
         self.last_scan_time = None
         self.monitored_coins = []
+        self.correlation = RollingCorrelation()
+        self.clock = clock or system_clock
+        self.funding = FundingCache(exchange, self.clock)
         self.MIN_VOLUME_USDT = 500000  # Lowered to 500K USDT for testing
 
     def get_monitored_coins(self) -> List[Dict]:
@@ -22,9 +49,9 @@ class CoinScanner:
 
             for symbol in top_coins:
                 try:
-                    data = self.exchange.fetch_ohlcv(symbol, self.config.TIMEFRAME)
+                    data = self.exchange.fetch_candles(symbol, self.config.TIMEFRAME)
                     signal = self.strategy.get_signal(data)
-                    volume = data['volume'].iloc[-1] if not data.empty else 0
+                    volume = last_value(data['volume']) if not data.empty else 0
 
                     coin_info = {
                         'symbol': symbol,
@@ -156,36 +183,65 @@ class CoinScanner:
             self.logger.info(f"- {v}")
         self.logger.info("================================")
 
-        for symbol in top_coins:
-            # Skip if we already have a position in this symbol
-            if symbol in active_symbols:
-                self.logger.debug(f"Skipping {symbol} - already have an active position")
-                continue
-
+        # Open positions are fetched too so their returns stay in the correlation window
+        scanned = {}
+        coins = []
+        for symbol in top_coins + [s for s in active_symbols if s not in top_coins]:
             try:
                 # Get OHLCV data for the symbol
-                data = self.exchange.fetch_ohlcv(symbol, self.config.TIMEFRAME)
+                data = self.exchange.fetch_candles(symbol, self.config.TIMEFRAME)
                 if data.empty:
                     continue
+                scanned[symbol] = data
+
+                # Skip if we already have a position in this symbol
+                if symbol in active_symbols:
+                    self.logger.debug(f"Skipping {symbol} - already have an active position")
+                    if symbol in top_coins:
+                        coins.append({'symbol': symbol, 'volume': last_value(data['volume']), 'signal': None})
+                    continue
 
                 # Check for trading signals
                 signal = self.strategy.get_signal(data)
+                coins.append({'symbol': symbol, 'volume': last_value(data['volume']), 'signal': signal['action'] or None})
 
                 if signal['action']:
                     self.logger.info(f"Found {signal['action']} opportunity for {symbol}")
                     opportunities.append({
                         'symbol': symbol,
                         'signal': signal,
-                        'volume': data['volume'].iloc[-1]
+                        'volume': last_value(data['volume'])
                     })
 
             except Exception as e:
                 self.logger.error(f"Error analyzing {symbol}: {str(e)}")
                 continue
 
+        coins.sort(key=lambda x: x['volume'], reverse=True)
+        latest_scan.update(coins)
+
+        # Drop entries that would pay funding, joined from the cached market-wide rates
+        affordable = self.funding.filter_adverse(opportunities)
+        if len(affordable) < len(opportunities):
+            paying = [f"{o['symbol']} ({o['funding_rate']:+.4%})" for o in opportunities if o not in affordable]
+            self.logger.info(f"Skipped opportunities paying funding: {', '.join(paying)}")
+        opportunities = affordable
+
+        started = time.perf_counter()
+        self.correlation.update(scanned, self.config.TIMEFRAME, self.clock.time())
+
         # Sort opportunities by volume
         opportunities.sort(key=lambda x: x['volume'], reverse=True)
 
-        # Return only enough opportunities to reach MAX_POSITIONS
+        # Take the best opportunities that are not the same bet as each other or an open position
         slots_available = self.config.MAX_POSITIONS - len(active_positions)
-        return opportunities[:slots_available]
\ No newline at end of file
+        selected = select_decorrelated(opportunities, active_positions, self.correlation, slots_available)
+        skipped = [o['symbol'] for o in opportunities[:slots_available] if o not in selected]
+        if skipped:
+            self.logger.info(f"Skipped correlated opportunities: {', '.join(skipped)}")
+        self.logger.debug(f"Correlation filter took {(time.perf_counter() - started) * 1000:.2f} ms")
+        return selected
+
+
+# Global instance written by the trading loop and read by the dashboard
+latest_scan = LatestScan()
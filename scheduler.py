@@ -0,0 +1,111 @@
+import logging
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from clock import system_clock
+from config import Config
+from utils import timeframe_to_seconds
+
+
+class CandleScheduler:
+    """Wakes the trading loop at candle closes measured on the exchange clock"""
+
+    FINE_WAIT = 0.05  # switch from one long wait to short steps this close to the target
+    FINE_STEP = 0.005
+
+    def __init__(self, exchange, clock=None, stop_event: threading.Event = None):
+        self.exchange = exchange
+        self.clock = clock or system_clock
+        self.stop_event = stop_event or threading.Event()
+        self.logger = logging.getLogger(__name__)
+        self.offset = 0.0  # exchange time minus local time, seconds
+        self.sync_rtt: Optional[float] = None
+        self.last_sync: Optional[float] = None
+        self.cycles = deque(maxlen=Config.LATENCY_HISTORY)
+        self._current: Optional[Dict] = None
+
+    def sync(self, samples: int = 5):
+        """Estimate the exchange clock offset from the lowest round-trip sample"""
+        best_rtt = None
+        for _ in range(samples):
+            try:
+                sent = self.clock.time()
+                server_time = self.exchange.fetch_server_time() / 1000
+                received = self.clock.time()
+            except Exception as e:
+                self.logger.error(f"Clock sync sample failed: {str(e)}")
+                continue
+            rtt = received - sent
+            if best_rtt is None or rtt < best_rtt:
+                best_rtt = rtt
+                self.offset = server_time - (sent + received) / 2
+
+        self.last_sync = self.clock.time()
+        if best_rtt is not None:
+            self.sync_rtt = best_rtt
+            self.logger.info(f"Exchange clock offset {self.offset * 1000:+.1f} ms (rtt {best_rtt * 1000:.1f} ms)")
+
+    def server_time(self) -> float:
+        return self.clock.time() + self.offset
+
+    def next_close(self, timeframe: str) -> float:
+        """Exchange timestamp (seconds) of the next candle boundary for timeframe"""
+        period = timeframe_to_seconds(timeframe)
+        return (math.floor(self.server_time() / period) + 1) * period
+
+    def wait_for_close(self, timeframe: str) -> Optional[float]:
+        """Block until the next candle close plus buffer; returns the close time or None if stopped"""
+        if self.last_sync is None or self.clock.time() - self.last_sync > Config.CLOCK_SYNC_INTERVAL:
+            self.sync()
+
+        close_time = self.next_close(timeframe)
+        target = close_time + Config.CANDLE_CLOSE_BUFFER
+        self.logger.info(f"Waiting {target - self.server_time():.2f} seconds for next {timeframe} candle")
+
+        while True:
+            remaining = target - self.server_time()
+            if remaining <= 0:
+                break
+            step = remaining - self.FINE_WAIT if remaining > self.FINE_WAIT * 2 else min(remaining, self.FINE_STEP)
+            if self.clock.wait(self.stop_event, step):
+                return None
+
+        self._current = {'close_time': close_time, 'woke': self.server_time() - close_time,
+                         'signal': None, 'orders': []}
+        self.cycles.append(self._current)
+        return close_time
+
+    def record_signal(self) -> Optional[float]:
+        """Mark the moment the scan produced its signals; returns seconds since the candle close"""
+        if self._current is None:
+            return None
+        self._current['signal'] = self.server_time() - self._current['close_time']
+        return self._current['signal']
+
+    def record_order(self) -> Optional[float]:
+        """Mark an order acknowledgement; returns seconds since the candle close"""
+        if self._current is None:
+            return None
+        latency = self.server_time() - self._current['close_time']
+        self._current['orders'].append(latency)
+        return latency
+
+    def latency_summary(self) -> Dict:
+        """Close-to-wake, close-to-signal and close-to-order percentiles in milliseconds"""
+        def percentiles(values):
+            if not values:
+                return None
+            ordered = sorted(values)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            return {'p50': pick(0.5), 'p95': pick(0.95), 'max': ordered[-1] * 1000}
+
+        cycles = list(self.cycles)
+        return {
+            'cycles': len(cycles),
+            'offset_ms': self.offset * 1000,
+            'wake': percentiles([c['woke'] for c in cycles]),
+            'signal': percentiles([c['signal'] for c in cycles if c['signal'] is not None]),
+            'order': percentiles([latency for c in cycles for latency in c['orders']]),
+        }
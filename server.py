@@ -5,16 +5,24 @@ from wtforms.validators import DataRequired, NumberRange
 import logging
 import os
 import secrets
+import time
 from config import Config
-from exchange import BlofingExchange
-from scanner import CoinScanner
-from bot_control import bot_controller
-from trading_bot import run_trading_bot
+from engine import EngineControl, RemoteEngine
+from resilience import resilience
+from indicators import indicator_graph
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
 logger = logging.getLogger(__name__)
 
+# In-process engine by default; start_server(remote=True) swaps in the split-deployment proxy
+backend = EngineControl()
+
+@app.template_filter('journal_time')
+def journal_time(ts_ms: int) -> str:
+    """Format a journal timestamp (ms) for display"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts_ms / 1000))
+
 class ConfigurationForm(FlaskForm):
     timeframe = StringField('Timeframe', validators=[DataRequired()])
     position_size = FloatField('Position Size', validators=[DataRequired(), NumberRange(min=0)])
@@ -24,42 +32,78 @@ class ConfigurationForm(FlaskForm):
     top_coins_to_scan = IntegerField('Top Coins to Scan', validators=[DataRequired(), NumberRange(min=1, max=50)])
     submit = SubmitField('Save Configuration')
 
+def config_form(config: dict) -> ConfigurationForm:
+    return ConfigurationForm(data={key.lower(): value for key, value in config.items()})
+
 @app.route('/')
 def index():
     try:
-        form = ConfigurationForm(obj=Config)
-        exchange = BlofingExchange()
-        scanner = CoinScanner(exchange, Config)
-        monitored_coins = []
-        positions = []
-
-        try:
-            monitored_coins = scanner.get_monitored_coins()
-        except Exception as e:
-            logger.error(f"Error fetching monitored coins: {str(e)}")
-            flash("Error fetching monitored coins. Please check the logs.", "error")
-
-        try:
-            positions = exchange.get_positions()
-        except Exception as e:
-            logger.error(f"Error fetching positions: {str(e)}")
-            flash("Error fetching positions. Please check the logs.", "error")
+        state = backend.dashboard()
+        for error in state['errors']:
+            flash(error, "error")
+        scanned_at = state['monitored_coins_at']
 
         return render_template('dashboard.html',
-                            form=form,
-                            monitored_coins=monitored_coins,
-                            positions=positions,
-                            config=Config,
-                            bot_running=bot_controller.is_running())
+                            form=config_form(state['config']),
+                            monitored_coins=state['monitored_coins'],
+                            monitored_coins_age=time.time() - scanned_at if scanned_at is not None else None,
+                            positions=state['positions'],
+                            config=state['config'],
+                            exchange_health=state['exchange_health'],
+                            indicator_stats=state['indicator_stats'],
+                            bot_running=state['bot_running'])
     except Exception as e:
         logger.error(f"Error in index route: {str(e)}")
         flash(f"An error occurred: {str(e)}", "error")
         return render_template('dashboard.html',
                             form=ConfigurationForm(),
                             monitored_coins=[],
+                            monitored_coins_age=None,
                             positions=[],
-                            config=Config,
-                            bot_running=bot_controller.is_running())
+                            config=Config.editable(),
+                            exchange_health=resilience.status(),
+                            indicator_stats=indicator_graph.stats(),
+                            bot_running=False)
+
+@app.route('/analytics')
+def analytics():
+    """Trade journal analytics for the last N days"""
+    try:
+        days = request.args.get('days', 7, type=int)
+        return render_template('analytics.html', days=days, **backend.analytics(days))
+    except Exception as e:
+        logger.error(f"Error in analytics route: {str(e)}")
+        flash(f"An error occurred: {str(e)}", "error")
+        return redirect(url_for('index'))
+
+@app.route('/memory')
+def memory_status():
+    """RSS, object-count and traced-memory gauges over time"""
+    try:
+        return jsonify(backend.memory_status())
+    except Exception as e:
+        logger.error(f"Memory status failed: {str(e)}")
+        return jsonify({"success": False, "error": str(e)})
+
+@app.route('/memory/snapshot', methods=['POST'])
+def memory_snapshot():
+    """Top allocators now; becomes the baseline for /memory/diff"""
+    try:
+        limit = request.args.get('limit', 25, type=int)
+        return jsonify(backend.memory_snapshot(limit))
+    except Exception as e:
+        logger.error(f"Memory snapshot failed: {str(e)}")
+        return jsonify({"success": False, "error": str(e)})
+
+@app.route('/memory/diff')
+def memory_diff():
+    """Allocation growth since the last snapshot"""
+    try:
+        limit = request.args.get('limit', 25, type=int)
+        return jsonify(backend.memory_diff(limit))
+    except Exception as e:
+        logger.error(f"Memory diff failed: {str(e)}")
+        return jsonify({"success": False, "error": str(e)})
 
 @app.route('/update_config', methods=['POST'])
 def update_config():
@@ -67,12 +111,14 @@ def update_config():
     form = ConfigurationForm()
     if form.validate_on_submit():
         try:
-            Config.TIMEFRAME = form.timeframe.data
-            Config.POSITION_SIZE = float(form.position_size.data)
-            Config.LEVERAGE = int(form.leverage.data)
-            Config.ISOLATED = bool(form.isolated.data)
-            Config.MAX_POSITIONS = int(form.max_positions.data)
-            Config.TOP_COINS_TO_SCAN = int(form.top_coins_to_scan.data)
+            backend.update_config({
+                'TIMEFRAME': form.timeframe.data,
+                'POSITION_SIZE': form.position_size.data,
+                'LEVERAGE': form.leverage.data,
+                'ISOLATED': form.isolated.data,
+                'MAX_POSITIONS': form.max_positions.data,
+                'TOP_COINS_TO_SCAN': form.top_coins_to_scan.data,
+            })
 
             flash('Configuration updated successfully!', 'success')
             logger.info("Configuration updated successfully")
@@ -90,7 +136,7 @@ def update_config():
 @app.route('/start_bot', methods=['POST'])
 def start_bot():
     try:
-        if bot_controller.start_bot(run_trading_bot):
+        if backend.start_bot():
             logger.info("Bot started successfully")
             return jsonify({"success": True})
         logger.warning("Bot is already running")
@@ -102,7 +148,7 @@ def start_bot():
 @app.route('/stop_bot', methods=['POST'])
 def stop_bot():
     try:
-        if bot_controller.stop_bot():
+        if backend.stop_bot():
             logger.info("Bot stopped successfully")
             return jsonify({"success": True})
         logger.warning("Bot is not running")
@@ -111,11 +157,26 @@ def stop_bot():
         logger.error(f"Failed to stop bot: {str(e)}")
         return jsonify({"success": False, "error": str(e)})
 
-def start_server():
-    """Start the Flask server"""
+@app.route('/emergency_flatten', methods=['POST'])
+def emergency_flatten():
+    """Stop the bot and close everything"""
+    try:
+        report = backend.emergency_flatten()
+        if report['flat']:
+            return jsonify({"success": True, "report": report})
+        return jsonify({"success": False, "error": "Positions or orders still open", "report": report})
+    except Exception as e:
+        logger.error(f"Emergency flatten failed: {str(e)}")
+        return jsonify({"success": False, "error": str(e)})
+
+def start_server(remote: bool = False):
+    """Start the Flask server; remote serves a trading engine running in another process"""
+    global backend
     try:
-        logger.info("Starting web server on port 8080")
+        if remote:
+            backend = RemoteEngine()
+        logger.info(f"Starting web server on port 8080 ({'split' if remote else 'single'} process mode)")
         app.run(host='0.0.0.0', port=8080, debug=False)
     except Exception as e:
         logger.error(f"Failed to start web server: {str(e)}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,528 @@
+"""Accelerated-clock paper trading
+
+Replays candles through a local matching engine and runs the unchanged
+`run_trading_bot` loop, scanner and notifier against it on a virtual clock.
+
+Usage:
+    python simulator.py --synthetic 20 --days 1
+    python simulator.py --replay candles.json --timeframe 5m --speed 600
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional
+
+import ccxt
+import numpy as np
+
+from bot_control import bot_controller
+from candles import Candles, CANDLE_DTYPE
+from clock import SystemClock
+from config import Config
+from journal import close_journal
+from notifications import TelegramNotifier
+from trading_bot import run_trading_bot
+from utils import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class SimPosition:
+    __slots__ = ('symbol', 'side', 'quantity', 'entry_price', 'margin', 'leverage',
+                 'tp_price', 'sl_price', 'next_index', 'opened_at')
+
+    def __init__(self, symbol: str, side: str, quantity: float, entry_price: float, margin: float,
+                 leverage: int, tp_price: Optional[float], sl_price: Optional[float], next_index: int,
+                 opened_at: int):
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.entry_price = entry_price
+        self.margin = margin
+        self.leverage = leverage
+        self.tp_price = tp_price
+        self.sl_price = sl_price
+        self.next_index = next_index  # first candle not yet checked for TP/SL
+        self.opened_at = opened_at
+
+    @property
+    def direction(self) -> int:
+        return 1 if self.side == 'long' else -1
+
+    @property
+    def liquidation_price(self) -> float:
+        return self.entry_price * (1 - self.direction / self.leverage)
+
+
+class MatchingEngine:
+    """Fills market orders against replayed candles and triggers TP/SL intrabar"""
+
+    def __init__(self, candles: Dict[str, np.ndarray], timeframe: str,
+                 initial_balance: float = None, taker_fee: float = None):
+        self.candles = candles
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_seconds(timeframe) * 1000
+        self.balance = initial_balance if initial_balance is not None else Config.SIM_INITIAL_BALANCE
+        self.taker_fee = taker_fee if taker_fee is not None else Config.SIM_TAKER_FEE
+        self.positions: Dict[str, SimPosition] = {}
+        self.trades = deque(maxlen=Config.SIM_MAX_TRADES)  # most recent closed trades
+        self.closed_trades = 0
+        self.wins = 0
+        self.orders = 0
+        self.now_ms = 0
+        # Cumulative quote volume gives O(1) rolling 24h volume for tickers
+        self._quote_volume = {symbol: np.cumsum(data['close'] * data['volume']) for symbol, data in candles.items()}
+
+    def closed_count(self, symbol: str) -> int:
+        """Number of candles of symbol that have closed by the current time"""
+        return int(np.searchsorted(self.candles[symbol]['timestamp'], self.now_ms - self.tf_ms, side='right'))
+
+    def closed_candles(self, symbol: str, limit: int = 100) -> np.ndarray:
+        end = self.closed_count(symbol)
+        return self.candles[symbol][max(0, end - limit):end]
+
+    def last_price(self, symbol: str) -> float:
+        data = self.closed_candles(symbol, 1)
+        if not len(data):
+            raise ccxt.BadSymbol(f"No data for {symbol} yet")
+        return float(data['close'][-1])
+
+    def quote_volume_24h(self, symbol: str) -> float:
+        end = self.closed_count(symbol)
+        if end == 0:
+            return 0.0
+        window = max(1, 86_400_000 // self.tf_ms)
+        cumulative = self._quote_volume[symbol]
+        return float(cumulative[end - 1] - (cumulative[end - 1 - window] if end > window else 0.0))
+
+    def used_margin(self) -> float:
+        return sum(pos.margin for pos in self.positions.values())
+
+    def unrealized_pnl(self, pos: SimPosition) -> float:
+        return (self.last_price(pos.symbol) - pos.entry_price) * pos.quantity * pos.direction
+
+    def market_order(self, symbol: str, side: str, quantity: float, leverage: int,
+                     tp_price: Optional[float], sl_price: Optional[float]) -> Dict:
+        """Fill at the open of the candle in progress, i.e. the first price after the signal close"""
+        data = self.candles.get(symbol)
+        if data is None:
+            raise ccxt.BadSymbol(f"Unknown symbol {symbol}")
+        index = self.closed_count(symbol)
+        if index >= len(data):
+            raise ccxt.ExchangeNotAvailable(f"Replay data exhausted for {symbol}")
+
+        price = float(data['open'][index])
+        notional = quantity * price
+        fee = notional * self.taker_fee
+        position_side = 'long' if side == 'buy' else 'short'
+        pos = self.positions.get(symbol)
+
+        if pos is None or pos.side == position_side:
+            margin = notional / leverage
+            if margin + fee > self.balance - self.used_margin():
+                raise ccxt.InsufficientFunds(f"Insufficient margin for {symbol}: need {margin:.2f}")
+            if pos is None:
+                pos = SimPosition(symbol, position_side, quantity, price, margin, leverage,
+                                  tp_price, sl_price, index, self.now_ms)
+                self.positions[symbol] = pos
+            else:
+                # Scale-in: average the entry and take the latest TP/SL
+                total = pos.quantity + quantity
+                pos.entry_price = (pos.entry_price * pos.quantity + price * quantity) / total
+                pos.quantity = total
+                pos.margin += margin
+                pos.tp_price = tp_price or pos.tp_price
+                pos.sl_price = sl_price or pos.sl_price
+            self.balance -= fee
+        else:
+            # Opposite side in net mode reduces the position
+            closed = min(quantity, pos.quantity)
+            self._close(pos, price, 'reduce', closed)
+
+        self.orders += 1
+        return {
+            'id': str(self.orders),
+            'symbol': symbol,
+            'type': 'market',
+            'side': side,
+            'amount': quantity,
+            'filled': quantity,
+            'average': price,
+            'price': price,
+            'status': 'closed',
+            'timestamp': self.now_ms,
+            'fee': {'cost': fee, 'currency': 'USDT'},
+        }
+
+    def close_position(self, symbol: str):
+        """Market-close the whole position at the last traded price"""
+        pos = self.positions.get(symbol)
+        if pos is None:
+            raise ccxt.InvalidOrder(f"No open position on {symbol}")
+        self.orders += 1
+        self._close(pos, self.last_price(symbol), 'close')
+
+    def _close(self, pos: SimPosition, price: float, reason: str, quantity: float = None):
+        quantity = pos.quantity if quantity is None else quantity
+        fee = quantity * price * self.taker_fee
+        pnl = (price - pos.entry_price) * quantity * pos.direction - fee
+        self.balance += pnl
+        self.closed_trades += 1
+        self.wins += pnl > 0
+        self.trades.append({
+            'symbol': pos.symbol,
+            'side': pos.side,
+            'entry_price': pos.entry_price,
+            'exit_price': price,
+            'quantity': quantity,
+            'pnl': pnl,
+            'reason': reason,
+            'opened_at': pos.opened_at,
+            'closed_at': self.now_ms,
+        })
+        logger.info(f"[SIM] {reason.upper()} {pos.side} {pos.symbol} @ {price:.6f}, PnL {pnl:.2f} USDT")
+        if quantity >= pos.quantity:
+            del self.positions[pos.symbol]
+        else:
+            pos.margin *= 1 - quantity / pos.quantity
+            pos.quantity -= quantity
+
+    def advance_to(self, now_ms: int):
+        """Move time forward and trigger TP/SL/liquidation on every candle that closed meanwhile"""
+        self.now_ms = now_ms
+        for pos in list(self.positions.values()):
+            data = self.candles[pos.symbol]
+            end = self.closed_count(pos.symbol)
+            for i in range(pos.next_index, end):
+                pos.next_index = i + 1
+                exit_price, reason = self._check_bar(pos, data[i])
+                if exit_price is not None:
+                    self._close(pos, exit_price, reason)
+                    break
+
+    def _check_bar(self, pos: SimPosition, bar):
+        """Exit price and reason if the bar hits a stop, liquidation or target; stops win ties"""
+        bar_open, high, low = float(bar['open']), float(bar['high']), float(bar['low'])
+        if pos.side == 'long':
+            stop = max(filter(None, (pos.sl_price, pos.liquidation_price)))
+            if low <= stop:
+                reason = 'sl' if stop == pos.sl_price else 'liquidation'
+                return min(bar_open, stop), reason
+            if pos.tp_price and high >= pos.tp_price:
+                return max(bar_open, pos.tp_price), 'tp'
+        else:
+            stop = min(filter(None, (pos.sl_price, pos.liquidation_price)))
+            if high >= stop:
+                reason = 'sl' if stop == pos.sl_price else 'liquidation'
+                return max(bar_open, stop), reason
+            if pos.tp_price and low <= pos.tp_price:
+                return min(bar_open, pos.tp_price), 'tp'
+        return None, None
+
+    @property
+    def end_ms(self) -> int:
+        """Time at which the last candle of every symbol has closed"""
+        return max(int(data['timestamp'][-1]) for data in self.candles.values()) + self.tf_ms
+
+
+class SimulatedClient:
+    """Subset of the ccxt client used directly by the scanner and order book code"""
+
+    def __init__(self, engine: MatchingEngine):
+        self.engine = engine
+        self.markets = {
+            symbol: {
+                'id': symbol.split(':')[0].replace('/', '-'),
+                'symbol': symbol,
+                'quote': symbol.split('/')[1].split(':')[0],
+                'active': True,
+                'contractSize': 1.0,
+            }
+            for symbol in engine.candles
+        }
+
+    def load_markets(self, reload: bool = False) -> Dict:
+        return self.markets
+
+    def market(self, symbol: str) -> Dict:
+        if symbol not in self.markets:
+            raise ccxt.BadSymbol(f"Unknown symbol {symbol}")
+        return self.markets[symbol]
+
+    def fetch_markets(self) -> List[Dict]:
+        return list(self.markets.values())
+
+    def fetch_ticker(self, symbol: str) -> Dict:
+        self.market(symbol)
+        return {
+            'symbol': symbol,
+            'last': self.engine.last_price(symbol),
+            'quoteVolume': self.engine.quote_volume_24h(symbol),
+            'timestamp': self.engine.now_ms,
+        }
+
+
+class SimulatedExchange:
+    """Drop-in replacement for `BlofingExchange` backed by the matching engine"""
+
+    def __init__(self, engine: MatchingEngine):
+        self.engine = engine
+        self.exchange = SimulatedClient(engine)
+        self.order_books = None
+        self.leverage: Dict[str, int] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def create_order(self, symbol: str, order_type: str, side: str, amount: float,
+                     price: float = None, params: Dict = None) -> Dict:
+        """Market orders only; amount is the USD margin as in `BlofingExchange.create_order`"""
+        if order_type != 'market':
+            raise ValueError(f"Simulator only supports market orders, got {order_type}")
+        if side not in ['buy', 'sell']:
+            raise ValueError(f"Invalid side: {side}")
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+
+        params = params or {}
+        sl_price = params.get('stopLoss', {}).get('price') or params.get('slTriggerPx')
+        tp_price = params.get('takeProfit', {}).get('price') or params.get('tpTriggerPx')
+        leverage = self.leverage.get(symbol, Config.LEVERAGE)
+        quantity = amount * Config.LEVERAGE / self.engine.last_price(symbol)
+
+        return self.engine.market_order(symbol, side, quantity, leverage,
+                                        float(tp_price) if tp_price else None,
+                                        float(sl_price) if sl_price else None)
+
+    def fetch_server_time(self) -> int:
+        return self.engine.now_ms
+
+    def fetch_closing_fills(self, symbol: str, position_side: str, since: int) -> List[Dict]:
+        return [
+            {'price': t['exit_price'], 'quantity': t['quantity'], 'pnl': t['pnl'],
+             'fee': t['quantity'] * t['exit_price'] * self.engine.taker_fee, 'ts': t['closed_at']}
+            for t in self.engine.trades
+            if t['symbol'] == symbol and t['side'] == position_side and t['closed_at'] >= since
+        ]
+
+    def fetch_funding_snapshot(self) -> Dict[str, Dict]:
+        """Flat SIM_FUNDING_RATE for every symbol, settling on the usual 8h grid"""
+        period_ms = 8 * 3600 * 1000
+        funding_time = (self.engine.now_ms // period_ms + 1) * period_ms
+        return {
+            symbol: {'funding_rate': Config.SIM_FUNDING_RATE, 'funding_time': funding_time,
+                     'mark_price': self.engine.last_price(symbol)}
+            for symbol in self.engine.candles
+        }
+
+    def fetch_candles(self, symbol: str, timeframe: str) -> Candles:
+        if timeframe != self.engine.timeframe:
+            raise Exception(f"Failed to fetch OHLCV data: replay is {self.engine.timeframe}, not {timeframe}")
+        return Candles(self.engine.closed_candles(symbol), symbol, timeframe)
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str):
+        return self.fetch_candles(symbol, timeframe).to_dataframe()
+
+    def set_leverage(self, symbol: str, leverage: int):
+        if leverage <= 0:
+            raise Exception("Setting leverage failed: Leverage must be positive")
+        self.leverage[symbol] = leverage
+
+    def fetch_pending_orders(self, tpsl: bool = False) -> List[Dict]:
+        """Fills are immediate, so only position TP/SL orders can be pending"""
+        if not tpsl:
+            return []
+        return [{'instId': self.exchange.market(pos.symbol)['id'], 'tpslId': pos.symbol}
+                for pos in self.engine.positions.values() if pos.tp_price or pos.sl_price]
+
+    def cancel_orders_batch(self, orders: List[Dict], tpsl: bool = False) -> int:
+        cancelled = 0
+        for order in orders:
+            pos = self.engine.positions.get(order.get('tpslId'))
+            if tpsl and pos is not None:
+                pos.tp_price = pos.sl_price = None
+                cancelled += 1
+        return cancelled
+
+    def close_position(self, symbol: str, margin_mode: str = None) -> Dict:
+        self.engine.close_position(symbol)
+        return {'instId': self.exchange.market(symbol)['id'], 'positionSide': 'net'}
+
+    def get_positions(self, symbol: str = None) -> List[Dict]:
+        positions = []
+        for pos in self.engine.positions.values():
+            if symbol and pos.symbol != symbol:
+                continue
+            positions.append({
+                'symbol': pos.symbol,
+                'side': pos.side,
+                'contracts': pos.quantity,
+                'entryPrice': pos.entry_price,
+                'markPrice': self.engine.last_price(pos.symbol),
+                'unrealizedPnl': self.engine.unrealized_pnl(pos),
+                'initialMargin': pos.margin,
+                'leverage': pos.leverage,
+                'takeProfitPrice': pos.tp_price,
+                'stopLossPrice': pos.sl_price,
+            })
+        return positions
+
+
+class SimulatedNotifier(TelegramNotifier):
+    """Runs the notifier formatting and dispatch path but records messages locally"""
+
+    def __init__(self):
+        self.chat_id = None
+        self.messages = deque(maxlen=Config.SIM_MAX_MESSAGES)
+        self.sent = 0
+
+    async def _send_message(self, message: str):
+        self.messages.append(message)
+        self.sent += 1
+
+
+class SimClock(SystemClock):
+    """Virtual clock; sleeping advances the matching engine instead of waiting"""
+
+    def __init__(self, engine: MatchingEngine, start_ms: int, speed: float = 0.0):
+        self.engine = engine
+        self.speed = speed  # virtual seconds per real second, 0 runs as fast as possible
+        self.finished = threading.Event()
+        self.engine.advance_to(start_ms)
+
+    def time(self) -> float:
+        return self.engine.now_ms / 1000
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def sleep(self, seconds: float):
+        if self.engine.now_ms >= self.engine.end_ms:
+            self.finished.set()
+            time.sleep(0.01)  # let the controller stop the loop
+            return
+        self.engine.advance_to(self.engine.now_ms + int(seconds * 1000))
+        if self.speed:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        if event.is_set():
+            return True
+        self.sleep(seconds)
+        return event.is_set()
+
+
+def synthetic_candles(symbols: int, count: int, timeframe: str, seed: int = 42) -> Dict[str, np.ndarray]:
+    """Random-walk candles for offline soak tests"""
+    rng = np.random.default_rng(seed)
+    tf_ms = timeframe_to_seconds(timeframe) * 1000
+    start = (int(time.time() * 1000) // tf_ms - count) * tf_ms
+    result = {}
+    for n in range(symbols):
+        closes = rng.uniform(0.5, 500) * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+        opens = np.concatenate(([closes[0]], closes[:-1]))
+        wick = np.abs(rng.normal(0, 0.002, (2, count)))
+        data = np.empty(count, dtype=CANDLE_DTYPE)
+        data['timestamp'] = start + np.arange(count) * tf_ms
+        data['open'] = opens
+        data['close'] = closes
+        data['high'] = np.maximum(opens, closes) * (1 + wick[0])
+        data['low'] = np.minimum(opens, closes) * (1 - wick[1])
+        data['volume'] = rng.uniform(2e6, 5e7, count) / closes / 288
+        result[f"SIM{n}/USDT:USDT"] = data
+    return result
+
+
+def load_replay(path: str) -> Dict[str, np.ndarray]:
+    """Load a JSON file of {symbol: [[timestamp, open, high, low, close, volume], ...]}"""
+    with open(path) as f:
+        raw = json.load(f)
+    return {symbol: Candles.from_ohlcv(sorted(rows)).data for symbol, rows in raw.items()}
+
+
+def run_simulation(candles: Dict[str, np.ndarray], timeframe: str, speed: float = 0.0,
+                   warmup: int = 100, journal_path: str = None) -> Dict:
+    """Run the real trading loop over the replay and return a summary
+
+    Simulated trades are journaled to journal_path, or to a temporary file that is
+    discarded afterwards, never to the live journal.
+    """
+    live_path = Config.JOURNAL_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.JOURNAL_PATH = journal_path or os.path.join(tmp, 'journal.bin')
+        close_journal()  # the loop reopens the journal at the simulation path
+        try:
+            return _simulate(candles, timeframe, speed, warmup)
+        finally:
+            close_journal()
+            Config.JOURNAL_PATH = live_path
+
+
+def _simulate(candles: Dict[str, np.ndarray], timeframe: str, speed: float, warmup: int) -> Dict:
+    Config.TIMEFRAME = timeframe
+    engine = MatchingEngine(candles, timeframe)
+    first = min(int(data['timestamp'][0]) for data in candles.values())
+    start_ms = first + (warmup + 1) * engine.tf_ms + 2000  # just after a candle close
+    clock = SimClock(engine, start_ms, speed)
+    exchange = SimulatedExchange(engine)
+    notifier = SimulatedNotifier()
+    initial_balance = engine.balance
+
+    started = time.perf_counter()
+    if not bot_controller.start_bot(partial(run_trading_bot, exchange=exchange, notifier=notifier, clock=clock)):
+        raise RuntimeError("Bot is already running")
+    clock.finished.wait()
+    bot_controller.stop_bot()
+    bot_controller.bot_thread.join()
+    elapsed = time.perf_counter() - started
+
+    simulated_seconds = (engine.now_ms - start_ms) / 1000
+    return {
+        'symbols': len(candles),
+        'candles': int(simulated_seconds // (engine.tf_ms / 1000)),
+        'simulated_hours': simulated_seconds / 3600,
+        'wall_seconds': elapsed,
+        'speedup': simulated_seconds / elapsed if elapsed else float('inf'),
+        'orders': engine.orders,
+        'closed_trades': engine.closed_trades,
+        'win_rate': engine.wins / engine.closed_trades if engine.closed_trades else 0.0,
+        'pnl': engine.balance - initial_balance,
+        'open_positions': len(engine.positions),
+        'notifications': notifier.sent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paper-trade the bot on replayed candles")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--replay', help="JSON file of {symbol: ohlcv rows}")
+    source.add_argument('--synthetic', type=int, metavar='SYMBOLS', help="Generate random-walk symbols")
+    parser.add_argument('--days', type=float, default=1.0, help="Days of synthetic candles to simulate")
+    parser.add_argument('--timeframe', default='5m')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Virtual seconds per real second (0 = as fast as possible)")
+    parser.add_argument('--verbose', action='store_true', help="Keep the bot's INFO logging")
+    parser.add_argument('--journal', help="Keep the simulated trade journal at this path (default: discarded)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.replay:
+        candles = load_replay(args.replay)
+    else:
+        per_day = 86400 // timeframe_to_seconds(args.timeframe)
+        candles = synthetic_candles(args.synthetic, int(per_day * args.days) + 101, args.timeframe)
+
+    summary = run_simulation(candles, args.timeframe, args.speed, journal_path=args.journal)
+    for key, value in summary.items():
+        print(f"{key:>16}: {value:,.2f}" if isinstance(value, float) else f"{key:>16}: {value}")
+
+
+if __name__ == '__main__':
+    main()
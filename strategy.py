@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, Optional, Union
+from candles import Candles, last_value
+from indicators import indicator_graph, sma_node, ema_node, bands_node
+
+CandleData = Union[pd.DataFrame, Candles]
+Band = Union[pd.Series, np.ndarray]  # Series for DataFrames, ndarray for Candles
 
 class TradingStrategy:
     def __init__(self, sma_period: int, ema_period: int):
@@ -9,26 +14,40 @@ class TradingStrategy:
         self.ema_period = ema_period
         self.logger = logging.getLogger(__name__)
 
-    def calculate_bands(self, data: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
-        """Calculate SMA and EMA bands with validation"""
+    def calculate_bands(self, data: CandleData) -> Tuple[Band, Band]:
+        """Calculate SMA and EMA bands with validation
+
+        DataFrames produce Series; `Candles` take the NumPy fast path and produce ndarrays,
+        read from the shared indicator graph so each is computed once per candle.
+        """
         if len(data) < max(self.sma_period, self.ema_period):
             raise ValueError(f"Not enough data points. Need at least {max(self.sma_period, self.ema_period)} points.")
 
-        sma = data['close'].rolling(window=self.sma_period, min_periods=self.sma_period).mean()
-        ema = data['close'].ewm(span=self.ema_period, adjust=False, min_periods=self.ema_period).mean()
+        if isinstance(data, Candles):
+            sma = indicator_graph.value(data, sma_node(self.sma_period))
+            ema = indicator_graph.value(data, ema_node(self.ema_period))
+        else:
+            sma = data['close'].rolling(window=self.sma_period, min_periods=self.sma_period).mean()
+            ema = data['close'].ewm(span=self.ema_period, adjust=False, min_periods=self.ema_period).mean()
 
-        self.logger.info(f"Last SMA value: {sma.iloc[-1]:.2f}, Last EMA value: {ema.iloc[-1]:.2f}")
+        self.logger.info(f"Last SMA value: {last_value(sma):.2f}, Last EMA value: {last_value(ema):.2f}")
         return sma, ema
 
-    def get_signal(self, data: pd.DataFrame) -> Dict:
+    def band_levels(self, data: CandleData) -> Tuple[float, float]:
+        """Latest upper and lower band values"""
+        sma, ema = self.calculate_bands(data)
+        if isinstance(data, Candles):
+            upper, lower = indicator_graph.value(data, bands_node(self.sma_period, self.ema_period))
+            return last_value(upper), last_value(lower)
+        return max(last_value(sma), last_value(ema)), min(last_value(sma), last_value(ema))
+
+    def get_signal(self, data: CandleData) -> Dict:
         """Generate trading signal based on band strategy with improved validation"""
         if data.empty:
             return {'action': None, 'entry_price': None, 'tp_price': None, 'sl_price': None}
 
-        sma, ema = self.calculate_bands(data)
-        current_price = float(data['close'].iloc[-1])
-        upper_band = max(sma.iloc[-1], ema.iloc[-1])
-        lower_band = min(sma.iloc[-1], ema.iloc[-1])
+        upper_band, lower_band = self.band_levels(data)
+        current_price = last_value(data['close'])
 
         signal = {
             'action': None,
@@ -63,15 +82,13 @@ class TradingStrategy:
 
         return signal
 
-    def should_scale_position(self, data: pd.DataFrame, position_type: str) -> bool:
+    def should_scale_position(self, data: CandleData, position_type: str) -> bool:
         """Determine if position should be scaled with improved logic"""
         if data.empty or position_type not in ['long', 'short']:
             return False
 
-        sma, ema = self.calculate_bands(data)
-        current_price = float(data['close'].iloc[-1])
-        upper_band = max(sma.iloc[-1], ema.iloc[-1])
-        lower_band = min(sma.iloc[-1], ema.iloc[-1])
+        upper_band, lower_band = self.band_levels(data)
+        current_price = last_value(data['close'])
 
         # Scale long position when price hits lower band
         if position_type == 'long' and current_price <= lower_band:
@@ -1,30 +1,90 @@
 import logging
-import time
-from datetime import datetime
 from config import Config
 from exchange import BlofingExchange
 from scanner import CoinScanner
 from strategy import TradingStrategy
 from notifications import TelegramNotifier
+from orderbook import OrderBookManager
 from bot_control import bot_controller
+from clock import system_clock
+from scheduler import CandleScheduler
+from journal import get_journal, FILL, SCALE_IN, EXIT_TP, EXIT_SL, EXIT_OTHER, SIGNAL, ORDER
 
 logger = logging.getLogger(__name__)
 
-def get_next_candle_time(timeframe='5m'):
-    """Calculate when the next candle will close"""
-    current_time = datetime.now()
-    minutes = int(timeframe[:-1])  # Extract minutes from timeframe
-    remaining_seconds = (minutes - (current_time.minute % minutes)) * 60 - current_time.second
-    return remaining_seconds + 2  # Add 2 seconds buffer
-
-def run_trading_bot():
-    """Run the trading bot with improved resilience for long-running sessions"""
+def _ms(seconds):
+    """Seconds to milliseconds for journal latencies, NaN when unknown"""
+    return float('nan') if seconds is None else seconds * 1000
+
+def record_position_changes(journal, exchange, previous, positions, targets, now_ms):
+    """Journal fills, scale-ins and exits by diffing positions against the previous cycle"""
+    current = {pos['symbol']: pos for pos in positions}
+
+    for symbol, pos in current.items():
+        side = 1 if pos.get('side') == 'long' else -1
+        contracts = float(pos['contracts'])
+        before = previous.get(symbol)
+        if before is None:
+            tp, sl = targets.get(symbol, (0.0, 0.0))
+            journal.record(FILL, symbol, now_ms, side=side, price=float(pos.get('entryPrice') or 0),
+                           quantity=contracts, tp=tp, sl=sl)
+            pos['_opened_at'] = now_ms
+        else:
+            pos['_opened_at'] = before.get('_opened_at', now_ms)
+            added = contracts - float(before['contracts'])
+            if added > 0:
+                journal.record(SCALE_IN, symbol, now_ms, side=side, price=float(pos.get('entryPrice') or 0),
+                               quantity=added)
+
+    for symbol, before in previous.items():
+        if symbol in current:
+            continue
+        side = before.get('side')
+        try:
+            fills = exchange.fetch_closing_fills(symbol, side, before.get('_opened_at', now_ms))
+        except Exception as e:
+            logger.error(f"Could not fetch closing fills for {symbol}: {str(e)}")
+            fills = []
+        quantity = sum(fill['quantity'] for fill in fills)
+        price = sum(fill['price'] * fill['quantity'] for fill in fills) / quantity if quantity else 0.0
+        tp, sl = targets.pop(symbol, (0.0, 0.0))
+        if not price or not (tp or sl):
+            event = EXIT_OTHER
+        else:
+            event = EXIT_TP if abs(price - (tp or float('inf'))) < abs(price - (sl or float('inf'))) else EXIT_SL
+        journal.record(event, symbol, now_ms, side=1 if side == 'long' else -1, price=price,
+                       quantity=quantity or float(before['contracts']),
+                       pnl=sum(fill['pnl'] for fill in fills), fee=sum(fill['fee'] for fill in fills),
+                       tp=tp, sl=sl)
+
+    # Targets of orders that never turned into a position would otherwise pile up
+    for symbol in [symbol for symbol in targets if symbol not in current]:
+        del targets[symbol]
+
+    return current
+
+def run_trading_bot(exchange=None, notifier=None, clock=None):
+    """Run the trading bot with improved resilience for long-running sessions
+
+    The exchange, notifier and clock default to the live ones; the simulator injects
+    its own so the same loop can be replayed faster than real time.
+    """
+    clock = clock or system_clock
+    order_books = None
     try:
         # Initialize components
-        exchange = BlofingExchange()
+        if exchange is None:
+            exchange = BlofingExchange()
+            order_books = OrderBookManager(exchange)
+            order_books.start()
+            exchange.order_books = order_books
         strategy = TradingStrategy(Config.SMA_PERIOD, Config.EMA_PERIOD)
-        notifier = TelegramNotifier()
-        scanner = CoinScanner(exchange, Config)
+        notifier = notifier or TelegramNotifier()
+        scanner = CoinScanner(exchange, Config, clock)
+        scheduler = CandleScheduler(exchange, clock, bot_controller.stop_event)
+        journal = get_journal()
+        known_positions = None  # positions seen last cycle, for fill/exit detection
+        order_targets = {}  # symbol -> (tp, sl) of the order that opened it
 
         logger.info(f"Bot started with max positions: {Config.MAX_POSITIONS}")
         logger.info(f"Position size: {Config.POSITION_SIZE} USDT, Leverage: {Config.LEVERAGE}x")
@@ -36,13 +96,13 @@ def run_trading_bot():
         monitored_coins = scanner.get_top_volume_coins()
         logger.info(f"Initially monitoring {len(monitored_coins)} coins")
 
-        last_status_update = datetime.now()
+        last_status_update = clock.now()
         reconnection_attempts = 0
         max_reconnection_attempts = 5
 
         while bot_controller.is_running():
             try:
-                current_time = datetime.now()
+                current_time = clock.now()
 
                 # Send status update every 6 hours
                 if (current_time - last_status_update).total_seconds() > 21600:  # 6 hours
@@ -58,7 +118,7 @@ def run_trading_bot():
                         logger.error(f"Status update failed: {str(e)}")
                         if reconnection_attempts < max_reconnection_attempts:
                             reconnection_attempts += 1
-                            time.sleep(60)  # Wait before retry
+                            clock.wait(bot_controller.stop_event, 60)  # Wait before retry
                             continue
                         else:
                             raise Exception("Max reconnection attempts reached")
@@ -68,11 +128,17 @@ def run_trading_bot():
                     positions = exchange.get_positions()
                     logger.info(f"Current active positions: {len(positions)}")
                     reconnection_attempts = 0  # Reset counter after successful operation
+                    now_ms = int(clock.time() * 1000)
+                    if known_positions is None:
+                        known_positions = {pos['symbol']: {**pos, '_opened_at': now_ms} for pos in positions}
+                    else:
+                        known_positions = record_position_changes(
+                            journal, exchange, known_positions, positions, order_targets, now_ms)
                 except Exception as e:
                     logger.error(f"Failed to fetch positions: {str(e)}")
                     if reconnection_attempts < max_reconnection_attempts:
                         reconnection_attempts += 1
-                        time.sleep(60)
+                        clock.wait(bot_controller.stop_event, 60)
                         continue
                     else:
                         raise Exception("Max reconnection attempts reached")
@@ -80,6 +146,17 @@ def run_trading_bot():
                 # Check for space for new positions
                 if len(positions) < Config.MAX_POSITIONS:
                     opportunities = scanner.scan_for_opportunities(positions)
+                    signal_latency = _ms(scheduler.record_signal())
+                    for opportunity in opportunities:
+                        signal = opportunity['signal']
+                        journal.record(SIGNAL, opportunity['symbol'], int(clock.time() * 1000),
+                                       side=1 if signal['action'] == 'long' else -1,
+                                       price=signal['entry_price'], tp=signal['tp_price'],
+                                       sl=signal['sl_price'], latency=signal_latency)
+
+                    # Keep books warm for candidates and open positions
+                    if order_books:
+                        order_books.track(scanner.monitored_coins + [pos['symbol'] for pos in positions])
 
                     for opportunity in opportunities:
                         if not bot_controller.is_running():
@@ -93,7 +170,7 @@ def run_trading_bot():
 
                         # Set leverage for the symbol
                         try:
-                            exchange.set_leverage(Config.LEVERAGE, symbol)
+                            exchange.set_leverage(symbol, Config.LEVERAGE)
                         except Exception as e:
                             logger.error(f"Failed to set leverage for {symbol}: {str(e)}")
                             continue
@@ -117,6 +194,15 @@ def run_trading_bot():
                                     }
                                 }
                             )
+                            order_latency = _ms(scheduler.record_order())
+                            order_targets[symbol] = (signal['tp_price'], signal['sl_price'])
+                            journal.record(ORDER, symbol, int(clock.time() * 1000),
+                                           side=1 if signal['action'] == 'long' else -1,
+                                           price=float(order.get('average') or signal['entry_price']),
+                                           quantity=float(order.get('filled') or order.get('amount') or 0),
+                                           fee=float((order.get('fee') or {}).get('cost') or 0),
+                                           tp=signal['tp_price'], sl=signal['sl_price'],
+                                           latency=order_latency)
 
                             # Notify about new position
                             notifier.notify(
@@ -135,21 +221,23 @@ def run_trading_bot():
                             logger.error(f"Failed to create order for {symbol}: {str(e)}")
                             continue
 
-                # Wait for next candle
-                sleep_time = get_next_candle_time(Config.TIMEFRAME)
-                logger.info(f"Waiting {sleep_time} seconds for next {Config.TIMEFRAME} candle")
-
-                # Check bot status more frequently
-                for _ in range(sleep_time):
-                    if not bot_controller.is_running():
-                        break
-                    time.sleep(1)
+                # Wait for next candle close on the exchange clock; stop requests wake it early
+                if scheduler.cycles:
+                    latency = scheduler.latency_summary()
+                    if latency['signal']:
+                        logger.info(f"Close-to-signal latency p50 {latency['signal']['p50']:.0f} ms, "
+                                    f"p95 {latency['signal']['p95']:.0f} ms")
+                scheduler.wait_for_close(Config.TIMEFRAME)
 
             except Exception as e:
                 logger.error(f"Error in main loop: {str(e)}")
                 if 'notifier' in locals():
                     notifier.notify(f"⚠️ Error: {str(e)}")
-                time.sleep(60)
+                clock.wait(bot_controller.stop_event, 60)
+
+        if order_books:
+            order_books.stop()
+        journal.flush()
 
         # Notify bot stop
         if 'notifier' in locals():
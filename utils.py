@@ -21,3 +21,10 @@ def validate_timeframe(timeframe: str) -> bool:
     """Validate timeframe format"""
     valid_timeframes = ['1m', '5m', '15m', '30m', '1h', '4h', '1d']
     return timeframe in valid_timeframes
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """Convert a timeframe such as '5m', '4h' or '1d' to seconds"""
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if not timeframe or timeframe[-1] not in units or not timeframe[:-1].isdigit():
+        raise ValueError(f"Invalid timeframe: {timeframe}")
+    return int(timeframe[:-1]) * units[timeframe[-1]]